@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the server's hot paths, compared against stored baselines.
+
+Covers the event store (store/replay at several stream depths), tool listing,
+tool call dispatch with a stubbed provider, template listing/search over a
+cached catalogue and JSON serialization of tool results. Nothing touches the
+network, so the suite runs offline.
+
+Baselines are per-machine: record them with --update-baseline on the machine
+that runs the comparison, then rerun after a change to catch regressions.
+A benchmark regresses when it is slower than its baseline by more than
+--tolerance and by more than --min-delta microseconds, so sub-microsecond
+operations don't fail on timer noise.
+
+Usage:
+    python benchmarks/hot_paths.py                      # compare with baseline
+    python benchmarks/hot_paths.py --update-baseline    # record a new baseline
+    python benchmarks/hot_paths.py --filter event_store --tolerance 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Offline, quiet configuration; must be set before the server modules load
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ["SHARED_CACHE_PATH"] = ""
+os.environ.setdefault("SLIDESPEAK_API_KEY", "benchmark-key")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import mcp.types as types  # noqa: E402
+
+import server  # noqa: E402
+from event_store import InMemoryEventStore  # noqa: E402
+from services import slidespeak_provider  # noqa: E402
+from services.template_catalogue import template_catalogue, normalize_template  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Minimum wall time of one timing run, and number of runs (best one is kept)
+MIN_RUN_SECONDS = 0.2
+REPEAT = 5
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark. The decorated function returns the callable to time."""
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def make_message(index: int) -> types.JSONRPCMessage:
+    return types.JSONRPCMessage(
+        types.JSONRPCResponse(
+            jsonrpc="2.0",
+            id=index,
+            result={"content": [{"type": "text", "text": "x" * 400}], "isError": False},
+        )
+    )
+
+
+GENERATION_RESULT = {
+    "message": "PowerPoint generated successfully. Make sure to return the pptx url to the user.",
+    "is_error": False,
+    "task_id": "3f8a9c1e-benchmark",
+    "status": "SUCCESS",
+    "pptx_url": "https://example.com/presentations/benchmark.pptx",
+    "timings": {"submitted_at": 1.0, "completed_at": 31.5, "elapsed_seconds": 30.5, "polls": 15},
+}
+
+TEMPLATES = [
+    {
+        "name": f"template-{index} {word}",
+        "images": {"cover": f"https://example.com/{index}/cover.png", "content": f"https://example.com/{index}/content.png"},
+    }
+    for index, word in enumerate(["business", "modern", "gradient", "minimal", "school", "pitch"] * 40)
+]
+
+
+async def _stub_generate(**kwargs):
+    return GENERATION_RESULT
+
+
+def _call_tool_request(name: str, arguments: dict) -> types.CallToolRequest:
+    return types.CallToolRequest(method="tools/call", params=types.CallToolRequestParams(name=name, arguments=arguments))
+
+
+# Event store
+
+for depth in (10, 100, 1000):
+    @benchmark(f"event_store.store_event[depth={depth}]")
+    def _store_event(depth=depth):
+        store = InMemoryEventStore(max_events_per_stream=depth)
+        message = make_message(0)
+        asyncio.get_event_loop().run_until_complete(_fill(store, depth))
+        return lambda: store.store_event("stream", message)
+
+    @benchmark(f"event_store.replay_events_after[depth={depth}]")
+    def _replay(depth=depth):
+        store = InMemoryEventStore(max_events_per_stream=depth)
+        first_id = asyncio.get_event_loop().run_until_complete(_fill(store, depth))
+
+        async def send(event_message):
+            pass
+
+        return lambda: store.replay_events_after(first_id, send)
+
+
+async def _fill(store: InMemoryEventStore, depth: int) -> str:
+    event_ids = [await store.store_event("stream", make_message(index)) for index in range(depth)]
+    return event_ids[0]
+
+
+# Tool listing and dispatch
+
+@benchmark("server.handle_list_tools")
+def _list_tools():
+    return server.handle_list_tools
+
+
+@benchmark("server.call_tool[get_available_templates]")
+def _call_templates():
+    handler = server.server.request_handlers[types.CallToolRequest]
+    request = _call_tool_request("get_available_templates", {"limit": 10})
+    return lambda: handler(request)
+
+
+@benchmark("server.call_tool[generate_powerpoint, stubbed]")
+def _call_generate():
+    server.generate_powerpoint = _stub_generate
+    handler = server.server.request_handlers[types.CallToolRequest]
+    request = _call_tool_request("generate_powerpoint", {"plain_text": "AI trends", "length": 5, "template": "default"})
+    return lambda: handler(request)
+
+
+# Template catalogue
+
+@benchmark("provider.get_available_templates[all]")
+def _templates_all():
+    return lambda: slidespeak_provider.get_available_templates()
+
+
+@benchmark("provider.get_available_templates[limit=10]")
+def _templates_page():
+    return lambda: slidespeak_provider.get_available_templates(limit=10)
+
+
+@benchmark("provider.search_templates")
+def _search():
+    return lambda: slidespeak_provider.search_templates("modern busi", limit=5)
+
+
+# Serialization
+
+@benchmark("server.tool_result[generation]")
+def _serialize_generation():
+    return lambda: server.tool_result(GENERATION_RESULT)
+
+
+@benchmark("server.tool_result[templates]")
+def _serialize_templates():
+    result = asyncio.get_event_loop().run_until_complete(slidespeak_provider.get_available_templates())
+    return lambda: server.tool_result(result)
+
+
+def time_callable(target) -> float:
+    """Best seconds per call over REPEAT runs of an auto-ranged call count."""
+    loop = asyncio.get_event_loop()
+    is_async = asyncio.iscoroutine(probe := target())
+    if is_async:
+        loop.run_until_complete(probe)
+
+        async def run(count):
+            for _ in range(count):
+                await target()
+    else:
+        def run(count):
+            for _ in range(count):
+                target()
+
+    def elapsed(count) -> float:
+        started = time.perf_counter()
+        if is_async:
+            loop.run_until_complete(run(count))
+        else:
+            run(count)
+        return time.perf_counter() - started
+
+    count = 1
+    while (duration := elapsed(count)) < MIN_RUN_SECONDS:
+        count *= 10 if duration < MIN_RUN_SECONDS / 10 else 2
+
+    return min(elapsed(count) / count for _ in range(REPEAT))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update-baseline", action="store_true", help="store results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown vs baseline (0.3 = 30%%)")
+    parser.add_argument(
+        "--min-delta", type=float, default=1.0, help="slowdowns below this many microseconds per op are noise"
+    )
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this text")
+    args = parser.parse_args()
+
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    # Serve the template catalogue from memory
+    template_catalogue.set([normalize_template(template) for template in TEMPLATES])
+    template_catalogue.ttl = float("inf")
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<52}{'us/op':>10}{'baseline':>10}{'change':>9}")
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+
+        seconds = time_callable(setup())
+        results[name] = seconds * 1e6
+        line = f"{name:<52}{results[name]:>10.2f}"
+        if name in baseline:
+            change = results[name] / baseline[name] - 1
+            line += f"{baseline[name]:>10.2f}{change:>+9.0%}"
+            if change > args.tolerance and results[name] - baseline[name] > args.min_delta:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.update_baseline:
+        baseline.update({name: round(value, 3) for name, value in results.items()})
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(dict(sorted(baseline.items())), f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    if regressions:
+        print(
+            f"{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%} "
+            f"and {args.min_delta:g} us/op"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
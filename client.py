@@ -63,7 +63,7 @@ async def test_server_connectivity(session):
         # Get list of available tools
         tools = await session.list_tools()
         available_tools = [tool.name for tool in tools.tools]
-        expected_tools = ["get_available_templates", "generate_powerpoint", "generate_powerpoint_slide_by_slide"]
+        expected_tools = ["get_available_templates", "search_templates", "generate_powerpoint", "generate_powerpoint_slide_by_slide"]
         
         print(f"✅ Server connectivity successful")
         print(f"📚 Available tools: {available_tools}")
@@ -95,7 +95,7 @@ async def test_get_available_templates(session):
             arguments={}
         )
         print("✅ get_available_templates (no limit) successful")
-        response_data = json.loads(result.content[0].text)
+        response_data = result.structuredContent or json.loads(result.content[0].text)
         print("Response:", json.dumps(response_data, indent=2))
         
         # Test 2: Get limited templates
@@ -105,7 +105,7 @@ async def test_get_available_templates(session):
             arguments={"limit": 3}
         )
         print("✅ get_available_templates (with limit) successful")
-        response_data_limited = json.loads(result_limited.content[0].text)
+        response_data_limited = result_limited.structuredContent or json.loads(result_limited.content[0].text)
         print("Response:", json.dumps(response_data_limited, indent=2))
         
         # Test 3: Test with limit=1 for minimal response
@@ -115,16 +115,16 @@ async def test_get_available_templates(session):
             arguments={"limit": 1}
         )
         print("✅ get_available_templates (limit=1) successful")
-        response_data_single = json.loads(result_single.content[0].text)
+        response_data_single = result_single.structuredContent or json.loads(result_single.content[0].text)
         print("Response:", json.dumps(response_data_single, indent=2))
         
         # Store templates for other tests (use the full list)
         global available_templates, selected_template
-        if response_data.get("success") and "templates" in response_data:
+        if not response_data.get("is_error") and "templates" in response_data:
             available_templates = response_data["templates"]
             # Select the first available template or use default
             if available_templates:
-                selected_template = available_templates[0]
+                selected_template = available_templates[0]["name"]
                 print(f"📄 Selected template for testing: {selected_template}")
             else:
                 selected_template = TEST_TEMPLATE
@@ -160,7 +160,7 @@ async def test_generate_powerpoint(session):
             }
         )
         print("✅ generate_powerpoint successful")
-        response_data = json.loads(result.content[0].text)
+        response_data = result.structuredContent or json.loads(result.content[0].text)
         print("Response:", json.dumps(response_data, indent=2))
         return True
     except Exception as e:
@@ -188,7 +188,7 @@ async def test_generate_powerpoint_slide_by_slide(session):
             }
         )
         print("✅ generate_powerpoint_slide_by_slide successful")
-        response_data = json.loads(result.content[0].text)
+        response_data = result.structuredContent or json.loads(result.content[0].text)
         print("Response:", json.dumps(response_data, indent=2))
         return True
     except Exception as e:
@@ -3,7 +3,12 @@ from typing import Optional, List, Dict, Any
 
 # SlideSpeak schemas
 class GetAvailableTemplates(BaseModel):
-    limit: Optional[int] = None  # Optional limit on number of templates to return
+    limit: Optional[int] = None  # Optional limit on number of templates to return (page size)
+    cursor: Optional[str] = None  # Opaque next_cursor from a previous page
+
+class SearchTemplates(BaseModel):
+    query: str  # Free-text query matched against template names and metadata
+    limit: Optional[int] = None  # Maximum number of matches to return (default 5)
 
 class GeneratePowerpoint(BaseModel):
     plain_text: str
@@ -13,3 +18,63 @@ class GeneratePowerpoint(BaseModel):
 class GeneratePowerpointSlideBySlide(BaseModel):
     slides: List[Dict[str, Any]]
     template: str
+
+# Tool output schemas
+# Hand-written and flat (no $defs/anyOf): the MCP SDK validates every tool
+# result against its outputSchema, and the cost grows with schema complexity
+TEMPLATE_INFO_PROPERTIES = {
+    "name": {"type": "string"},
+    "cover": {"type": ["string", "null"]},  # Cover image URL
+    "content": {"type": ["string", "null"]},  # Content image URL
+}
+
+TEMPLATE_LIST_RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "message": {"type": "string"},
+        "is_error": {"type": "boolean"},
+        "templates": {
+            "type": "array",
+            "items": {"type": "object", "properties": TEMPLATE_INFO_PROPERTIES, "required": ["name"]},
+        },
+        "total": {"type": "integer"},  # Total number of templates in the catalogue
+        "version": {"type": "string"},  # Catalogue version the page was served from
+        "next_cursor": {"type": ["string", "null"]},  # Pass as `cursor` to get the next page
+    },
+    "required": ["message", "is_error"],
+}
+
+TEMPLATE_SEARCH_RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "message": {"type": "string"},
+        "is_error": {"type": "boolean"},
+        "matches": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                # score: relevance, higher is better
+                "properties": {**TEMPLATE_INFO_PROPERTIES, "score": {"type": "number"}},
+                "required": ["name", "score"],
+            },
+        },
+        "total": {"type": "integer"},  # Total number of templates in the catalogue
+    },
+    "required": ["message", "is_error"],
+}
+
+GENERATION_RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "message": {"type": "string"},
+        "is_error": {"type": "boolean"},
+        "task_id": {"type": ["string", "null"]},
+        "status": {"type": ["string", "null"]},  # Final upstream task status
+        "pptx_url": {"type": ["string", "null"]},
+        # submitted_at/completed_at (Unix timestamps), elapsed_seconds, polls
+        "timings": {"type": "object"},
+        "summary": {"type": ["object", "null"]},  # Presentation summary, when inspection is enabled
+        "cached": {"type": "boolean"},  # True when an identical earlier generation was reused
+    },
+    "required": ["message", "is_error"],
+}
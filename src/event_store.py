@@ -2,8 +2,11 @@
 In-memory event store for streamable HTTP transport.
 """
 import logging
-from collections import deque
-from dataclasses import dataclass
+import time
+import zlib
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Optional
 from uuid import uuid4
 
 from mcp.server.streamable_http import (
@@ -18,14 +21,76 @@ from mcp.types import JSONRPCMessage
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+class StreamOwner:
+    """
+    The session a group of streams belongs to, with its footprint in the store.
+
+    The transport stores events from tasks that inherit the context of the
+    request that created the session, so setting `stream_owner` around that
+    request attributes all of the session's streams to it. The session ID is
+    filled in once the transport has assigned one.
+    """
+    __slots__ = ("session_id", "streams", "bytes")
+
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id
+        self.streams: set[tuple["StreamOwner", StreamId]] = set()
+        self.bytes = 0
+
+
+# Owner of the events stored (or replayed) in the current context, if known
+stream_owner: ContextVar[Optional[StreamOwner]] = ContextVar("stream_owner", default=None)
+
+
 class EventEntry:
     """
     Represents an event entry in the event store.
+
+    The message is kept as its serialized JSON (zlib-compressed above a size
+    threshold) and only decoded back into a JSONRPCMessage when replayed.
     """
-    event_id: EventId
-    stream_id: StreamId
-    message: JSONRPCMessage
+    __slots__ = ("event_id", "stream_id", "owner", "data", "compressed")
+
+    def __init__(
+        self,
+        event_id: EventId,
+        stream_id: StreamId,
+        data: bytes,
+        compressed: bool = False,
+        owner: Optional[StreamOwner] = None,
+    ):
+        self.event_id = event_id
+        self.stream_id = stream_id
+        self.owner = owner
+        self.data = data
+        self.compressed = compressed
+
+    @classmethod
+    def encode(
+        cls,
+        event_id: EventId,
+        stream_id: StreamId,
+        message: JSONRPCMessage,
+        compress_threshold: int,
+        owner: Optional[StreamOwner] = None,
+    ) -> "EventEntry":
+        """Serialize a message the same way the transport sends it."""
+        data = message.model_dump_json(by_alias=True, exclude_none=True).encode("utf-8")
+        if compress_threshold > 0 and len(data) > compress_threshold:
+            compressed = zlib.compress(data, 1)
+            if len(compressed) < len(data):
+                return cls(event_id, stream_id, compressed, True, owner)
+        return cls(event_id, stream_id, data, owner=owner)
+
+    @property
+    def stream_key(self) -> tuple[Optional[StreamOwner], StreamId]:
+        return (self.owner, self.stream_id)
+
+    @property
+    def message(self) -> JSONRPCMessage:
+        """Decode the stored message."""
+        data = zlib.decompress(self.data) if self.compressed else self.data
+        return JSONRPCMessage.model_validate_json(data)
 
 
 class InMemoryEventStore(EventStore):
@@ -34,46 +99,132 @@ class InMemoryEventStore(EventStore):
     This is primarily intended for examples and testing, not for production use
     where a persistent storage solution would be more appropriate.
 
-    This implementation keeps only the last N events per stream for memory efficiency.
+    This implementation keeps only the last N events per stream for memory efficiency,
+    and drops whole streams once they have been idle too long or when the number
+    of streams exceeds a cap (least recently used first).
+
+    Streams are keyed by (owner, stream ID): the transport uses request IDs as
+    stream IDs, so sessions would otherwise share streams.
     """
 
-    def __init__(self, max_events_per_stream: int = 100):
+    def __init__(
+        self,
+        max_events_per_stream: int = 100,
+        compress_threshold: int = 1024,
+        max_streams: int = 10000,
+    ):
         """Initialize the event store.
 
         Args:
             max_events_per_stream: Maximum number of events to keep per stream
+            compress_threshold: Serialized messages larger than this many bytes
+                are zlib-compressed; 0 disables compression
+            max_streams: Maximum number of streams to keep; the least recently
+                written stream is dropped beyond it
         """
         self.max_events_per_stream = max_events_per_stream
-        # for maintaining last N events per stream
-        self.streams: dict[StreamId, deque[EventEntry]] = {}
+        self.compress_threshold = compress_threshold
+        self.max_streams = max_streams
+        # for maintaining last N events per stream, least recently written first
+        self.streams: OrderedDict[tuple, deque[EventEntry]] = OrderedDict()
         # event_id -> EventEntry for quick lookup
         self.event_index: dict[EventId, EventEntry] = {}
+        # stream key -> monotonic time of the last stored event
+        self.last_activity: dict[tuple, float] = {}
+        # total size of stored (possibly compressed) message data
+        self.total_bytes = 0
 
     async def store_event(
         self, stream_id: StreamId, message: JSONRPCMessage
     ) -> EventId:
         """Stores an event with a generated event ID."""
         event_id = str(uuid4())
-        event_entry = EventEntry(
-            event_id=event_id, stream_id=stream_id, message=message
+        owner = stream_owner.get()
+        event_entry = EventEntry.encode(
+            event_id, stream_id, message, self.compress_threshold, owner
         )
+        key = event_entry.stream_key
 
         # Get or create deque for this stream
-        if stream_id not in self.streams:
-            self.streams[stream_id] = deque(maxlen=self.max_events_per_stream)
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = self.streams[key] = deque(maxlen=self.max_events_per_stream)
+            if owner is not None:
+                owner.streams.add(key)
+            while len(self.streams) > self.max_streams:
+                self.remove_stream(next(iter(self.streams)))
+        else:
+            self.streams.move_to_end(key)
+        self.last_activity[key] = time.monotonic()
 
         # If deque is full, the oldest event will be automatically removed
         # We need to remove it from the event_index as well
-        if len(self.streams[stream_id]) == self.max_events_per_stream:
-            oldest_event = self.streams[stream_id][0]
+        if len(stream) == self.max_events_per_stream:
+            oldest_event = stream[0]
             self.event_index.pop(oldest_event.event_id, None)
+            self._count_bytes(oldest_event, -len(oldest_event.data))
 
         # Add new event
-        self.streams[stream_id].append(event_entry)
+        stream.append(event_entry)
         self.event_index[event_id] = event_entry
+        self._count_bytes(event_entry, len(event_entry.data))
 
         return event_id
 
+    def _count_bytes(self, event: EventEntry, delta: int) -> None:
+        self.total_bytes += delta
+        if event.owner is not None:
+            event.owner.bytes += delta
+
+    def remove_stream(self, key: tuple) -> None:
+        """Drop a stream, identified by its (owner, stream ID) key, and all of its events."""
+        events = self.streams.pop(key, None)
+        self.last_activity.pop(key, None)
+        if key[0] is not None:
+            key[0].streams.discard(key)
+        if events is None:
+            return
+        for event in events:
+            self.event_index.pop(event.event_id, None)
+            self._count_bytes(event, -len(event.data))
+
+    def remove_owner(self, owner: StreamOwner) -> int:
+        """Drop every stream of a session.
+
+        Returns:
+            The number of streams removed.
+        """
+        keys = list(owner.streams)
+        for key in keys:
+            self.remove_stream(key)
+        return len(keys)
+
+    def prune_idle(self, max_idle_seconds: float) -> int:
+        """Drop streams with no new events for max_idle_seconds.
+
+        Returns:
+            The number of streams removed.
+        """
+        cutoff = time.monotonic() - max_idle_seconds
+        # Streams are ordered by last write, so stop at the first active one
+        idle = []
+        for key in self.streams:
+            if self.last_activity.get(key, 0.0) > cutoff:
+                break
+            idle.append(key)
+
+        for key in idle:
+            self.remove_stream(key)
+        return len(idle)
+
+    def stats(self) -> dict:
+        """Stream and event counts and the retained message bytes."""
+        return {
+            "streams": len(self.streams),
+            "events": len(self.event_index),
+            "bytes": self.total_bytes,
+        }
+
     async def replay_events_after(
         self,
         last_event_id: EventId,
@@ -86,8 +237,12 @@ class InMemoryEventStore(EventStore):
 
         # Get the stream and find events after the last one
         last_event = self.event_index[last_event_id]
+        owner = stream_owner.get()
+        if owner is not None and last_event.owner is not None and last_event.owner is not owner:
+            logger.warning(f"Event ID {last_event_id} belongs to another session")
+            return None
         stream_id = last_event.stream_id
-        stream_events = self.streams.get(last_event.stream_id, deque())
+        stream_events = self.streams.get(last_event.stream_key, deque())
 
         # Events in deque are already in chronological order
         found_last = False
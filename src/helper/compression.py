@@ -0,0 +1,187 @@
+"""
+Negotiated response compression (brotli/gzip) that is safe for SSE streams.
+"""
+from starlette.datastructures import Headers, MutableHeaders
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is an optional dependency
+    brotli = None
+
+# Content types worth compressing; everything else passes through untouched
+COMPRESSIBLE_CONTENT_TYPES = ("application/json", "text/", "application/javascript")
+EVENT_STREAM_CONTENT_TYPE = "text/event-stream"
+
+
+class GzipEncoder:
+    content_encoding = "gzip"
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Emit everything compressed so far without ending the stream."""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    content_encoding = "br"
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        """Emit everything compressed so far without ending the stream."""
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def accepted_encodings(accept_encoding: str) -> dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q-value}."""
+    encodings = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[coding.strip().lower()] = quality
+    return encodings
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best encoding the client accepts.
+
+    Regular responses smaller than `minimum_size` are sent as-is. Server-sent
+    event streams are compressed incrementally and flushed after every chunk,
+    so each event reaches the client as soon as it is written and the event
+    framing is preserved.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        compress_event_streams: bool = True,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.compress_event_streams = compress_event_streams
+
+    def _encoder_factory(self, scope):
+        """Pick the accepted encoding with the highest q-value, brotli on ties."""
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        wildcard = accepted.get("*", 0.0)
+        candidates = [(accepted.get("gzip", wildcard), lambda: GzipEncoder(self.gzip_level))]
+        if brotli is not None:
+            candidates.insert(0, (accepted.get("br", wildcard), lambda: BrotliEncoder(self.brotli_quality)))
+
+        quality, factory = max(candidates, key=lambda candidate: candidate[0])
+        return factory if quality > 0 else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoder_factory = self._encoder_factory(scope)
+        if encoder_factory is None:
+            await self.app(scope, receive, send)
+            return
+
+        await CompressionResponder(self, encoder_factory)(scope, receive, send)
+
+
+class CompressionResponder:
+    """Per-request state of CompressionMiddleware."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoder_factory):
+        self.middleware = middleware
+        self.encoder_factory = encoder_factory
+        self.send = None
+        self.start_message = None
+        self.mode = None  # "identity", "buffered" or "stream"
+        self.encoder = None
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.middleware.app(scope, receive, self.send_with_compression)
+
+    def _start_encoding(self) -> None:
+        self.encoder = self.encoder_factory()
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoder.content_encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "content-length" in headers:
+            del headers["content-length"]
+
+    async def send_with_compression(self, message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Hold the headers until we know whether the body gets compressed
+            self.start_message = message
+            headers = Headers(raw=message.get("headers", []))
+            content_type = headers.get("content-type", "")
+            if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_CONTENT_TYPES):
+                self.mode = "identity"
+            elif content_type.startswith(EVENT_STREAM_CONTENT_TYPE):
+                self.mode = "stream" if self.middleware.compress_event_streams else "identity"
+            else:
+                self.mode = "buffered"
+
+            if self.mode == "stream":
+                self._start_encoding()
+            if self.mode != "buffered":
+                await self.send(message)
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.mode == "identity":
+            await self.send(message)
+        elif self.mode == "stream":
+            # Flush after every chunk so SSE events are not held in the encoder
+            data = self.encoder.compress(body)
+            data += self.encoder.flush() if more_body else self.encoder.finish()
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+        elif self.encoder is None and not more_body and len(body) < self.middleware.minimum_size:
+            # Small complete response: compression is not worth the CPU
+            self.mode = "identity"
+            await self.send(self.start_message)
+            await self.send(message)
+        else:
+            if self.encoder is None:
+                self._start_encoding()
+                await self.send(self.start_message)
+            data = self.encoder.compress(body)
+            if not more_body:
+                data += self.encoder.finish()
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
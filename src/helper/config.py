@@ -7,7 +7,76 @@ load_dotenv()
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", 5001))
 
+# Startup and graceful shutdown
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", 15.0))  # Seconds per cache warm-up attempt; /readyz reports 503 until one succeeds
+WARMUP_RETRY_MAX = float(os.getenv("WARMUP_RETRY_MAX", 30.0))  # Upper bound of the delay between failed warm-up attempts
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", 25.0))  # Seconds in-flight tool calls get to finish after SIGTERM
+SHUTDOWN_CONNECTION_TIMEOUT = float(os.getenv("SHUTDOWN_CONNECTION_TIMEOUT", 5.0))  # Seconds open streams get to close after draining
+RESTART_BACKOFF_MAX = float(os.getenv("RESTART_BACKOFF_MAX", 60.0))  # Upper bound of the delay between restarts after a crash
+
+MAX_REQUEST_BODY_BYTES = int(os.getenv("MAX_REQUEST_BODY_BYTES", 10 * 1024 * 1024))  # Larger requests get 413
+
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # "json" or "text"
+LOG_SAMPLE_INTERVAL = float(os.getenv("LOG_SAMPLE_INTERVAL", 30.0))  # Seconds between repeated poll log lines
 
 # SlideSpeak Configuration
 SLIDESPEAK_API_KEY = os.getenv("SLIDESPEAK_API_KEY")
+# Optional comma-separated pool of keys; SLIDESPEAK_API_KEY is added to it
+SLIDESPEAK_API_KEYS = [key.strip() for key in os.getenv("SLIDESPEAK_API_KEYS", "").split(",") if key.strip()]
+if SLIDESPEAK_API_KEY and SLIDESPEAK_API_KEY not in SLIDESPEAK_API_KEYS:
+    SLIDESPEAK_API_KEYS.insert(0, SLIDESPEAK_API_KEY)
+API_KEY_SELECTION = os.getenv("API_KEY_SELECTION", "round_robin")  # "round_robin" or "least_loaded"
+API_KEY_RATE_LIMIT = float(os.getenv("API_KEY_RATE_LIMIT", 5.0))  # Requests per second per key, 0 disables
+API_KEY_BURST = int(os.getenv("API_KEY_BURST", 10))
+API_KEY_MAX_CONNECTIONS = int(os.getenv("API_KEY_MAX_CONNECTIONS", 20))  # Connection pool size per key
+# Clients may supply their own key in this header; set ALLOW_SESSION_API_KEYS=false to ignore it
+SESSION_API_KEY_HEADER = os.getenv("SESSION_API_KEY_HEADER", "x-slidespeak-api-key")
+ALLOW_SESSION_API_KEYS = os.getenv("ALLOW_SESSION_API_KEYS", "true").lower() in ("1", "true", "yes")
+MAX_SESSION_API_KEYS = int(os.getenv("MAX_SESSION_API_KEYS", 256))
+
+# Resumability event store
+EVENT_STORE_MAX_EVENTS_PER_STREAM = int(os.getenv("EVENT_STORE_MAX_EVENTS_PER_STREAM", 100))
+EVENT_COMPRESS_THRESHOLD = int(os.getenv("EVENT_COMPRESS_THRESHOLD", 1024))  # Bytes; 0 disables compression
+EVENT_STORE_MAX_STREAMS = int(os.getenv("EVENT_STORE_MAX_STREAMS", 10000))
+
+# Stateful session reaping
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", 1800.0))  # Seconds without requests before a session is closed
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", 1000))  # Least recently used sessions are closed beyond this
+SESSION_REAP_INTERVAL = float(os.getenv("SESSION_REAP_INTERVAL", 60.0))
+
+# Seconds the template catalogue is cached before it is fetched again
+TEMPLATE_CACHE_TTL = float(os.getenv("TEMPLATE_CACHE_TTL", 300.0))
+# Seconds a completed generation is reused for an identical request. Off by
+# default: a repeated request then returns the earlier deck instead of a new one
+GENERATION_CACHE_TTL = float(os.getenv("GENERATION_CACHE_TTL", 0.0))
+# SQLite file shared by all of this user's workers on the host (created with
+# mode 0600); set to an empty value to disable
+SHARED_CACHE_PATH = os.path.expanduser(os.getenv(
+    "SHARED_CACHE_PATH",
+    os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.join("~", ".cache"), "slidespeak-mcp", "cache.sqlite3"),
+))
+L1_CACHE_TTL = float(os.getenv("L1_CACHE_TTL", 30.0))  # Max staleness of the in-process tier
+L1_CACHE_MAX_ENTRIES = int(os.getenv("L1_CACHE_MAX_ENTRIES", 256))
+
+# Generated presentation inspection (slide count, titles, file size)
+PPTX_INSPECTION_ENABLED = os.getenv("PPTX_INSPECTION_ENABLED", "false").lower() in ("1", "true", "yes")
+PPTX_INSPECTION_TIMEOUT = float(os.getenv("PPTX_INSPECTION_TIMEOUT", 30.0))
+
+# Fair scheduling of upstream generations across sessions
+MAX_CONCURRENT_GENERATIONS = int(os.getenv("MAX_CONCURRENT_GENERATIONS", 8))
+MAX_GENERATIONS_PER_SESSION = int(os.getenv("MAX_GENERATIONS_PER_SESSION", 2))
+SCHEDULER_STATS_MAX_SESSIONS = int(os.getenv("SCHEDULER_STATS_MAX_SESSIONS", 1000))  # Sessions whose wait times /stats/scheduler keeps
+
+# Event-loop monitoring and the /debug routes (disabled unless DEBUG_TOKEN is set)
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", 0.5))  # Seconds between lag samples
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", 0.25))  # Blocking time that triggers a stack dump
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN")
+MAX_PROFILE_SECONDS = float(os.getenv("MAX_PROFILE_SECONDS", 60.0))
+
+# Response compression (brotli requires the optional `brotli` package)
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))  # Bytes; smaller responses are sent uncompressed
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
+COMPRESS_EVENT_STREAMS = os.getenv("COMPRESS_EVENT_STREAMS", "true").lower() in ("1", "true", "yes")
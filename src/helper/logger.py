@@ -1,5 +1,13 @@
-from helper.config import LOG_LEVEL
+from helper.config import LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_INTERVAL
+from collections import OrderedDict
+from contextvars import ContextVar
+import logging.handlers
+import threading
 import logging
+import atexit
+import queue
+import json
+import time
 import sys
 
 # or doesn't have a valid log level value
@@ -17,8 +25,114 @@ log_level_mapping = {
 # Determine the log level based on the environment variable
 log_level = log_level_mapping.get(LOG_LEVEL, default_log_level)
 
+# MCP session of the tool call being handled, attached to every record
+session_id_var: ContextVar[str | None] = ContextVar("session_id", default=None)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s [%(filename)s:%(lineno)s - %(funcName)s ] - %(message)s"
+
+
+class ContextFilter(logging.Filter):
+    """
+    Attach task_id/session_id to records. Runs in the emitting thread, before
+    the record is handed to the queue, so context variables are still visible.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "task_id"):
+            record.task_id = None
+        if not hasattr(record, "session_id"):
+            record.session_id = session_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as single-line JSON objects. Tracebacks are already folded
+    into the message by QueueHandler.prepare.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "location": f"{record.filename}:{record.lineno}:{record.funcName}",
+        }
+        if record.task_id is not None:
+            entry["task_id"] = record.task_id
+        if record.session_id is not None:
+            entry["session_id"] = record.session_id
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+class LogSampler:
+    """
+    Rate-limit repetitive log messages per key.
+
+    At most one message per key is emitted every `interval` seconds; the next
+    emitted message reports how many were suppressed in between.
+    """
+
+    def __init__(self, interval: float, max_keys: int = 1024):
+        self.interval = interval
+        self.max_keys = max_keys
+        # key -> (last emitted timestamp, suppressed count)
+        self._state: OrderedDict[str, tuple[float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def should_log(self, key: str) -> tuple[bool, int]:
+        """Return whether to emit a message for key and how many were suppressed."""
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._state.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._state[key] = (last, suppressed + 1)
+                return False, 0
+
+            self._state[key] = (now, 0)
+            self._state.move_to_end(key)
+            while len(self._state) > self.max_keys:
+                self._state.popitem(last=False)
+            return True, suppressed
+
+    def forget(self, key: str) -> None:
+        """Drop sampling state for a key that will not be logged again."""
+        with self._lock:
+            self._state.pop(key, None)
+
+
+sampler = LogSampler(LOG_SAMPLE_INTERVAL)
+
+
+def log_sampled(key: str, level: int, msg: str, **kwargs) -> None:
+    """Log msg at level, rate-limited per key by the shared sampler."""
+    if not logging.getLogger().isEnabledFor(level):
+        return
+
+    emit, suppressed = sampler.should_log(key)
+    if emit:
+        if suppressed:
+            msg = f"{msg} ({suppressed} similar messages suppressed)"
+        logging.log(level, msg, stacklevel=2, **kwargs)
+
+
+# Records are queued by the calling thread and written to stdout by a
+# background listener, so logging never blocks the event loop on I/O
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+stream_handler = logging.StreamHandler(sys.stdout)  # directing logs to the standard output
+stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+queue_handler = logging.handlers.QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter("%(message)s"))  # final formatting happens in the listener
+queue_handler.addFilter(ContextFilter())
+
+queue_listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+queue_listener.start()
+atexit.register(queue_listener.stop)
+
 logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s [%(filename)s:%(lineno)s - %(funcName)s ] - %(message)s",
     level=log_level,
-    stream=sys.stdout,  # directing logs to the standard output
+    handlers=[queue_handler],
 )
@@ -0,0 +1,149 @@
+"""
+Event-loop lag monitoring and on-demand profiling (stdlib only).
+"""
+from helper.config import LOOP_LAG_INTERVAL, LOOP_STALL_THRESHOLD
+from collections import Counter
+import traceback
+import threading
+import logging
+import asyncio
+import cProfile
+import marshal
+import time
+import sys
+
+
+class EventLoopMonitor:
+    """
+    Measure event-loop lag and report callbacks that block the loop.
+
+    A coroutine sleeps for `interval` and records how late it wakes up. A
+    watchdog thread checks that the coroutine keeps making progress; when the
+    loop has been stuck for longer than `stall_threshold` it logs the loop
+    thread's current stack, which points at the blocking callback.
+    """
+
+    def __init__(self, interval: float, stall_threshold: float):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.samples = 0
+        self.stalls = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.loop_thread_id: int | None = None
+        self._heartbeat = time.monotonic()
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start sampling on the running loop."""
+        if self._task is not None:
+            return
+
+        self.loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop sampling and the watchdog thread."""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _sample(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - started - self.interval, 0.0)
+            self._heartbeat = now
+            self.samples += 1
+            self.last_lag = lag
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while not self._stop.wait(self.interval):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for < self.stall_threshold or heartbeat == reported_heartbeat:
+                continue
+
+            # Report each stall once, with the stack of the blocked loop thread
+            reported_heartbeat = heartbeat
+            self.stalls += 1
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unavailable>"
+            logging.warning(f"Event loop blocked for {stalled_for:.3f}s; loop thread stack:\n{stack}")
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "samples": self.samples,
+            "lag_last_ms": round(self.last_lag * 1000, 3),
+            "lag_max_ms": round(self.max_lag * 1000, 3),
+            "lag_avg_ms": round(self.total_lag / self.samples * 1000, 3) if self.samples else 0.0,
+            "stalls": self.stalls,
+        }
+
+
+event_loop_monitor = EventLoopMonitor(LOOP_LAG_INTERVAL, LOOP_STALL_THRESHOLD)
+
+
+async def cprofile_loop(seconds: float) -> bytes:
+    """
+    Profile everything running on the event loop for `seconds` with cProfile.
+
+    Returns:
+        The profile in pstats format (loadable with pstats.Stats / snakeviz).
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def _sample_stacks(thread_id: int, seconds: float, sample_interval: float) -> Counter:
+    """Sample a thread's stack periodically and count collapsed stacks."""
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_filename}:{code.co_qualname}")
+                frame = frame.f_back
+            stacks[";".join(reversed(names))] += 1
+        time.sleep(sample_interval)
+    return stacks
+
+
+async def sample_loop(seconds: float, sample_interval: float = 0.005) -> str:
+    """
+    Sample the event loop thread's stacks for `seconds` from a helper thread.
+
+    Returns:
+        Collapsed stacks ("frame;frame;frame count" per line), as consumed by
+        flamegraph.pl and speedscope.
+    """
+    thread_id = threading.get_ident()
+    stacks = await asyncio.to_thread(_sample_stacks, thread_id, seconds, sample_interval)
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
@@ -0,0 +1,63 @@
+"""
+Bounded ASGI request body ingestion.
+"""
+from starlette.datastructures import Headers
+
+
+class RequestBodyTooLarge(Exception):
+    """Raised when a request body exceeds the configured maximum size."""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"Request body exceeds the maximum size of {max_size} bytes")
+        self.max_size = max_size
+
+
+def declared_body_too_large(scope, max_size: int) -> bool:
+    """Check the Content-Length header against max_size before reading anything."""
+    content_length = Headers(scope=scope).get("content-length")
+    try:
+        return content_length is not None and int(content_length) > max_size
+    except ValueError:
+        return False
+
+
+async def read_body(receive, max_size: int) -> bytes:
+    """
+    Read a request body from an ASGI receive function.
+
+    Chunks are accumulated in a bytearray (linear time) and reading stops as
+    soon as more than max_size bytes have arrived.
+
+    Raises:
+        RequestBodyTooLarge: If the body is larger than max_size.
+    """
+    body = bytearray()
+    more_body = True
+
+    while more_body:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        body += message.get("body", b"")
+        if len(body) > max_size:
+            raise RequestBodyTooLarge(max_size)
+        more_body = message.get("more_body", False)
+
+    return bytes(body)
+
+
+def replay_receive(body: bytes, receive):
+    """
+    Return an ASGI receive function that yields an already-read body once and
+    then defers to the original receive (e.g. for disconnect notifications).
+    """
+    sent = False
+
+    async def wrapped_receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return wrapped_receive
@@ -0,0 +1,109 @@
+"""
+Server lifecycle: readiness after warm-up and graceful draining on shutdown.
+"""
+import asyncio
+import contextlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DRAIN_POLL_INTERVAL = 0.1  # Seconds between checks for in-flight tool calls
+
+
+class ServerDraining(Exception):
+    """Raised when a tool call arrives after draining has started."""
+
+
+class Lifecycle:
+    """
+    Tracks whether the server is ready for traffic and which tool calls are in
+    flight, so that shutdown can stop accepting new calls and wait for the
+    running ones instead of cutting them off.
+    """
+
+    def __init__(self):
+        # Created at import time of the server module, so this includes imports
+        self.started_at = time.monotonic()
+        self.ready_at = None
+        self.draining_since = None
+        self.warmup_attempts = 0
+        self.in_flight = 0
+        self.rejected = 0
+
+    def reset(self) -> None:
+        """Forget readiness, draining and in-flight state before the server is restarted."""
+        self.started_at = time.monotonic()
+        self.ready_at = None
+        self.draining_since = None
+        self.warmup_attempts = 0
+        self.in_flight = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None and self.draining_since is None
+
+    @property
+    def draining(self) -> bool:
+        return self.draining_since is not None
+
+    def mark_ready(self) -> None:
+        """Start reporting ready; logs the time taken since startup."""
+        self.ready_at = time.monotonic()
+        logger.info(f"Server ready {self.ready_at - self.started_at:.2f}s after startup")
+
+    @contextlib.contextmanager
+    def track(self):
+        """
+        Count a tool call as in flight for its duration.
+
+        Raises:
+            ServerDraining: If the server is draining.
+        """
+        if self.draining:
+            self.rejected += 1
+            raise ServerDraining("Server is shutting down. Please retry the request.")
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def begin_drain(self) -> None:
+        """Stop accepting new tool calls and report not ready."""
+        if self.draining_since is None:
+            self.draining_since = time.monotonic()
+            logger.info(f"Draining: rejecting new tool calls, {self.in_flight} in flight")
+
+    async def drain(self, timeout: float) -> int:
+        """Begin draining and wait up to `timeout` seconds for in-flight tool calls.
+
+        Returns:
+            The number of tool calls still running when the wait ended.
+        """
+        self.begin_drain()
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(DRAIN_POLL_INTERVAL)
+
+        if self.in_flight:
+            logger.warning(f"Drain timed out after {timeout}s with {self.in_flight} tool calls in flight")
+        else:
+            logger.info(f"Drained in {time.monotonic() - self.draining_since:.2f}s")
+        return self.in_flight
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "ready": self.ready,
+            "draining": self.draining,
+            "uptime_seconds": round(now - self.started_at, 1),
+            "startup_seconds": round(self.ready_at - self.started_at, 3) if self.ready_at is not None else None,
+            "warmup_attempts": self.warmup_attempts,
+            "in_flight_tool_calls": self.in_flight,
+            "rejected_tool_calls": self.rejected,
+        }
+
+
+lifecycle = Lifecycle()
@@ -1,92 +1,222 @@
+# Imported first: the lifecycle start time then covers the remaining imports
+from lifecycle import lifecycle, ServerDraining
 from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
 from starlette.middleware.cors import CORSMiddleware
-from constants.schema import *
+from constants.schema import (
+    GetAvailableTemplates,
+    SearchTemplates,
+    GeneratePowerpoint,
+    GeneratePowerpointSlideBySlide,
+    TEMPLATE_LIST_RESULT_SCHEMA,
+    TEMPLATE_SEARCH_RESULT_SCHEMA,
+    GENERATION_RESULT_SCHEMA,
+)
+from pydantic import ValidationError
 from starlette.applications import Starlette
-from event_store import InMemoryEventStore
+from event_store import InMemoryEventStore, StreamOwner, stream_owner
+from session_reaper import SessionReaper
+from starlette.datastructures import Headers
 from starlette.middleware import Middleware
 from constants.enum import Tools
-from helper.config import HOST, PORT, SLIDESPEAK_API_KEY
-from helper.logger import logging
+from helper.config import (
+    HOST,
+    PORT,
+    SESSION_API_KEY_HEADER,
+    ALLOW_SESSION_API_KEYS,
+    DEBUG_TOKEN,
+    MAX_PROFILE_SECONDS,
+    EVENT_STORE_MAX_EVENTS_PER_STREAM,
+    EVENT_STORE_MAX_STREAMS,
+    EVENT_COMPRESS_THRESHOLD,
+    SESSION_IDLE_TIMEOUT,
+    MAX_SESSIONS,
+    SESSION_REAP_INTERVAL,
+    COMPRESSION_ENABLED,
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESS_EVENT_STREAMS,
+    MAX_REQUEST_BODY_BYTES,
+    WARMUP_TIMEOUT,
+    WARMUP_RETRY_MAX,
+    DRAIN_TIMEOUT,
+    SHUTDOWN_CONNECTION_TIMEOUT,
+    RESTART_BACKOFF_MAX,
+)
+from helper.compression import CompressionMiddleware
+from helper.request_body import RequestBodyTooLarge, declared_body_too_large, read_body, replay_receive
+from helper.profiling import event_loop_monitor, cprofile_loop, sample_loop
+from helper.logger import logging, session_id_var
 from starlette.routing import Route
-from services.slidespeak_provider import *
+from services.slidespeak_provider import (
+    get_available_templates,
+    search_templates,
+    generate_powerpoint,
+    generate_powerpoint_slide_by_slide,
+    warm_up,
+)
+from services.api_key_pool import api_key_pool
+from services.scheduler import generation_scheduler
+from services.template_catalogue import template_catalogue
+from services.shared_cache import shared_cache
+from starlette.responses import JSONResponse, PlainTextResponse, Response
 from mcp.server import Server
 import mcp.types as types
 import contextlib
+import hmac
 import uvicorn
 import asyncio
 import json
+import time
 
 server = Server("slidespeak-mcp")
 
+# Tool definitions are static; build their schemas once
+TOOLS = [
+    # SlideSpeak tools
+    types.Tool(
+        name=Tools.GET_AVAILABLE_TEMPLATES,
+        description="Get all available presentation templates from SlideSpeak",
+        inputSchema=GetAvailableTemplates.model_json_schema(),
+        outputSchema=TEMPLATE_LIST_RESULT_SCHEMA,
+    ),
+    types.Tool(
+        name=Tools.SEARCH_TEMPLATES,
+        description="Search SlideSpeak templates by keyword and return the best matches (cheaper than listing every template)",
+        inputSchema=SearchTemplates.model_json_schema(),
+        outputSchema=TEMPLATE_SEARCH_RESULT_SCHEMA,
+    ),
+    types.Tool(
+        name=Tools.GENERATE_POWERPOINT,
+        description="Generate a PowerPoint presentation based on text, length, and template using SlideSpeak",
+        inputSchema=GeneratePowerpoint.model_json_schema(),
+        outputSchema=GENERATION_RESULT_SCHEMA,
+    ),
+    types.Tool(
+        name=Tools.GENERATE_POWERPOINT_SLIDE_BY_SLIDE,
+        description="Generate a PowerPoint presentation slide by slide based on slides array and template using SlideSpeak",
+        inputSchema=GeneratePowerpointSlideBySlide.model_json_schema(),
+        outputSchema=GENERATION_RESULT_SCHEMA,
+    ),
+]
+
+# Arguments are validated with these models instead of the SDK's per-call jsonschema check
+TOOL_ARGUMENTS = {
+    Tools.GET_AVAILABLE_TEMPLATES: GetAvailableTemplates,
+    Tools.SEARCH_TEMPLATES: SearchTemplates,
+    Tools.GENERATE_POWERPOINT: GeneratePowerpoint,
+    Tools.GENERATE_POWERPOINT_SLIDE_BY_SLIDE: GeneratePowerpointSlideBySlide,
+}
+
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
     """
     List available tools.
     Each tool specifies its arguments using JSON Schema validation.
     """
-    return [
-        # SlideSpeak tools
-        types.Tool(
-            name=Tools.GET_AVAILABLE_TEMPLATES,
-            description="Get all available presentation templates from SlideSpeak",
-            inputSchema=GetAvailableTemplates.model_json_schema(),
-        ),
-        types.Tool(
-            name=Tools.GENERATE_POWERPOINT,
-            description="Generate a PowerPoint presentation based on text, length, and template using SlideSpeak",
-            inputSchema=GeneratePowerpoint.model_json_schema(),
-        ),
-        types.Tool(
-            name=Tools.GENERATE_POWERPOINT_SLIDE_BY_SLIDE,
-            description="Generate a PowerPoint presentation slide by slide based on slides array and template using SlideSpeak",
-            inputSchema=GeneratePowerpointSlideBySlide.model_json_schema(),
-        ),
-    ]
+    return TOOLS
+
+
+def tool_result(result: dict) -> tuple[list[types.TextContent], dict]:
+    """
+    Build a tool result carrying both structured content and a compact JSON
+    text fallback for clients that do not read structuredContent.
+    """
+    text = json.dumps(result, separators=(",", ":"), ensure_ascii=False)
+    return [types.TextContent(type="text", text=text)], result
+
+
+def request_header(name: str) -> str | None:
+    """Return a header of the HTTP request behind the current tool call, if any."""
+    try:
+        request = server.request_context.request
+    except LookupError:
+        return None
+    return request.headers.get(name) if request is not None else None
 
 
-@server.call_tool()
-async def handle_call_tool(name: str, arguments: dict | None) -> types.CallToolResult:
+def session_api_key() -> str | None:
+    """Return the SlideSpeak API key supplied by the client session, if allowed."""
+    return request_header(SESSION_API_KEY_HEADER) if ALLOW_SESSION_API_KEYS else None
+
+
+@server.call_tool(validate_input=False)
+async def handle_call_tool(name: str, arguments: dict | None) -> tuple[list[types.TextContent], dict]:
     """
     Handle tool execution requests.
     Tools can modify server state and notify clients of changes.
     """
+    session_id = request_header("mcp-session-id")
+    session_id_var.set(session_id)
+    model = TOOL_ARGUMENTS.get(name)
+    if model is not None:
+        try:
+            model.model_validate(arguments or {}, strict=True)
+        except ValidationError as error:
+            return tool_result({"message": f"Input validation error: {error}", "is_error": True})
     try:
-        match name:
-            # SlideSpeak tools
-            case Tools.GET_AVAILABLE_TEMPLATES:
-                result = await get_available_templates(
-                    limit=arguments.get("limit") if arguments else None
-                )
-                return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
-            
-            case Tools.GENERATE_POWERPOINT:
+        with lifecycle.track():
+            return await dispatch_tool(name, arguments, session_id)
+    except ServerDraining as error:
+        logging.info(f"Rejected tool call {name}: server is draining")
+        return tool_result({"message": str(error), "is_error": True})
+    except Exception as error:
+        logging.error(f"Error calling tool {name}: {error}", exc_info=True)
+        error = {"message": f"Error: {str(error)}", "is_error": True}
+        return tool_result(error)
+
+
+async def dispatch_tool(name: str, arguments: dict | None, session_id: str | None) -> tuple[list[types.TextContent], dict]:
+    """Run a tool by name."""
+    match name:
+        # SlideSpeak tools
+        case Tools.GET_AVAILABLE_TEMPLATES:
+            result = await get_available_templates(
+                limit=arguments.get("limit") if arguments else None,
+                cursor=arguments.get("cursor") if arguments else None,
+                api_key=session_api_key(),
+            )
+            return tool_result(result)
+        
+        case Tools.SEARCH_TEMPLATES:
+            result = await search_templates(
+                query=arguments.get("query", ""),
+                limit=arguments.get("limit"),
+                api_key=session_api_key(),
+            )
+            return tool_result(result)
+
+        case Tools.GENERATE_POWERPOINT:
+            async with generation_scheduler.slot(session_id):
                 result = await generate_powerpoint(
                     plain_text=arguments.get("plain_text"),
                     length=arguments.get("length"),
-                    template=arguments.get("template")
+                    template=arguments.get("template"),
+                    api_key=session_api_key(),
                 )
-                return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
-            
-            case Tools.GENERATE_POWERPOINT_SLIDE_BY_SLIDE:
+            return tool_result(result)
+        
+        case Tools.GENERATE_POWERPOINT_SLIDE_BY_SLIDE:
+            async with generation_scheduler.slot(session_id):
                 result = await generate_powerpoint_slide_by_slide(
                     slides=arguments.get("slides", []),
-                    template=arguments.get("template")
+                    template=arguments.get("template"),
+                    api_key=session_api_key(),
                 )
-                return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
-            
-            case _:
-                return [types.TextContent(type="text", text=f"Unknown tool: {name}")]
-
-    except Exception as error:
-        print("Error:", error)
-        error = {"message": f"Error: {str(error)}", "is_error": True}
-        return [types.TextContent(type="text", text=json.dumps(error, indent=2))]
+            return tool_result(result)
+        
+        case _:
+            return [types.TextContent(type="text", text=f"Unknown tool: {name}")]
 
 
 async def create_app():
 
     # Create an event store for resumability
-    event_store = InMemoryEventStore(max_events_per_stream=100)
+    event_store = InMemoryEventStore(
+        max_events_per_stream=EVENT_STORE_MAX_EVENTS_PER_STREAM,
+        compress_threshold=EVENT_COMPRESS_THRESHOLD,
+        max_streams=EVENT_STORE_MAX_STREAMS,
+    )
 
     # Create the session manager with the event store
     try:
@@ -130,16 +260,87 @@ async def create_app():
         session_manager = None
 
 
+    # Reap idle sessions and their event streams
+    session_reaper = None
+    if session_manager is not None:
+        session_reaper = SessionReaper(
+            session_manager,
+            event_store,
+            idle_timeout=SESSION_IDLE_TIMEOUT,
+            max_sessions=MAX_SESSIONS,
+            interval=SESSION_REAP_INTERVAL,
+        )
+
     # Create a class for handling streamable HTTP connections
     class HandleStreamableHttp:
-        def __init__(self, session_manager):
+        def __init__(self, session_manager, session_reaper=None):
             self.session_manager = session_manager
+            self.session_reaper = session_reaper
+
+        async def handle_request(self, scope, receive, send):
+            """Forward to the session manager, recording session activity."""
+            if self.session_reaper is None:
+                await self.session_manager.handle_request(scope, receive, send)
+                return
+
+            session_id = Headers(scope=scope).get("mcp-session-id")
+            if session_id is None:
+                # New session: learn its ID from the response headers. The
+                # transport's tasks inherit this context, so every event
+                # stream of the session is attributed to `owner`
+                owner = StreamOwner()
+                token = stream_owner.set(owner)
+
+                async def send_and_track(message):
+                    if message["type"] == "http.response.start":
+                        new_session_id = Headers(raw=message.get("headers", [])).get("mcp-session-id")
+                        if new_session_id:
+                            owner.session_id = new_session_id
+                            self.session_reaper.touch(new_session_id, owner)
+                    await send(message)
+
+                try:
+                    await self.session_manager.handle_request(scope, receive, send_and_track)
+                finally:
+                    stream_owner.reset(token)
+                return
+
+            if self.session_reaper.was_terminated(session_id):
+                # As the transport answers for sessions it terminated itself;
+                # clients re-initialize on 404
+                await send_json_response(send, 404, {
+                    "jsonrpc": "2.0",
+                    "id": "server-error",
+                    "error": {"code": types.INVALID_REQUEST, "message": "Not Found: Session has been terminated"},
+                })
+                return
+
+            # Replays are limited to the session's own streams
+            token = stream_owner.set(self.session_reaper.owners.get(session_id))
+            self.session_reaper.begin(session_id)
+            try:
+                await self.session_manager.handle_request(scope, receive, send)
+            finally:
+                self.session_reaper.end(session_id)
+                stream_owner.reset(token)
 
         async def __call__(self, scope, receive, send):
             if self.session_manager is not None:
+                # Reject oversized bodies before handing the request to the
+                # session manager, which would otherwise buffer all of it
+                if declared_body_too_large(scope, MAX_REQUEST_BODY_BYTES):
+                    await send_json_response(send, 413, {"error": f"Request body exceeds {MAX_REQUEST_BODY_BYTES} bytes"})
+                    return
+                try:
+                    body = await read_body(receive, MAX_REQUEST_BODY_BYTES)
+                except RequestBodyTooLarge as e:
+                    await send_json_response(send, 413, {"error": str(e)})
+                    return
+                receive = replay_receive(body, receive)
+
                 try:
                     logging.info("Handling Streamable HTTP connection ....")
-                    await self.session_manager.handle_request(scope, receive, send)
+                    await self.handle_request(scope, receive, send)
                     logging.info("Streamable HTTP connection closed ....")
                 except Exception as e:
                     logging.error(f"Error handling Streamable HTTP request: {e}")
@@ -175,15 +376,8 @@ async def create_app():
     
     # Helper functions for OAuth handlers
     async def get_request_body(receive):
-        """Get request body from ASGI receive function."""
-        body = b""
-        more_body = True
-
-        while more_body:
-            message = await receive()
-            body += message.get("body", b"")
-            more_body = message.get("more_body", False)
-
+        """Get request body from ASGI receive function, up to MAX_REQUEST_BODY_BYTES."""
+        body = await read_body(receive, MAX_REQUEST_BODY_BYTES)
         return body.decode("utf-8")
 
     async def send_json_response(send, status, data):
@@ -209,10 +403,87 @@ async def create_app():
     if session_manager is not None:
         routes.append(
             Route(
-                "/mcp", endpoint=HandleStreamableHttp(session_manager), methods=["POST"]
+                "/mcp", endpoint=HandleStreamableHttp(session_manager, session_reaper), methods=["POST"]
             )
         )
 
+    async def scheduler_stats(request):
+        """Generation queue depth and wait times per session."""
+        return JSONResponse(generation_scheduler.stats())
+
+    routes.append(Route("/stats/scheduler", endpoint=scheduler_stats, methods=["GET"]))
+
+    async def session_stats(request):
+        """Live sessions, their idle time and event store footprint."""
+        if session_reaper is None:
+            return JSONResponse({"live_sessions": 0, "event_store": event_store.stats()})
+        return JSONResponse(session_reaper.stats())
+
+    routes.append(Route("/stats/sessions", endpoint=session_stats, methods=["GET"]))
+
+    async def healthz(request):
+        """Liveness: the event loop is serving requests."""
+        return JSONResponse({"status": "ok", "uptime_seconds": lifecycle.stats()["uptime_seconds"]})
+
+    async def readyz(request):
+        """Readiness: caches are warmed up and the server is not draining."""
+        return JSONResponse(lifecycle.stats(), status_code=200 if lifecycle.ready else 503)
+
+    routes.append(Route("/healthz", endpoint=healthz, methods=["GET"]))
+    routes.append(Route("/readyz", endpoint=readyz, methods=["GET"]))
+
+    # Only one profiler may run at a time (cProfile is process-wide on 3.12+).
+    # Created per app so a restart on a new event loop gets a fresh lock
+    profile_lock = asyncio.Lock()
+
+    def debug_authorized(request) -> bool:
+        """Debug routes require `Authorization: Bearer <DEBUG_TOKEN>`."""
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        return hmac.compare_digest(supplied.encode("utf-8"), DEBUG_TOKEN.encode("utf-8"))
+
+    async def debug_loop(request):
+        """Event-loop lag statistics."""
+        if not debug_authorized(request):
+            return JSONResponse({"error": "Unauthorized"}, status_code=401)
+        return JSONResponse(event_loop_monitor.stats())
+
+    async def debug_profile(request):
+        """
+        Profile the event loop for `seconds` (default 10) and return the result
+        as a pstats file (`format=pstats`) or collapsed stacks (`format=collapsed`).
+        """
+        if not debug_authorized(request):
+            return JSONResponse({"error": "Unauthorized"}, status_code=401)
+
+        try:
+            seconds = float(request.query_params.get("seconds", 10))
+        except ValueError:
+            return JSONResponse({"error": "seconds must be a number"}, status_code=400)
+        seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+
+        profile_format = request.query_params.get("format", "pstats")
+        if profile_format not in ("pstats", "collapsed"):
+            return JSONResponse({"error": "format must be 'pstats' or 'collapsed'"}, status_code=400)
+
+        if profile_lock.locked():
+            return JSONResponse({"error": "A profile is already being captured"}, status_code=409)
+
+        async with profile_lock:
+            logging.info(f"Capturing {profile_format} profile for {seconds}s")
+            if profile_format == "collapsed":
+                return PlainTextResponse(await sample_loop(seconds))
+
+            return Response(
+                await cprofile_loop(seconds),
+                media_type="application/octet-stream",
+                headers={"content-disposition": 'attachment; filename="slidespeak-mcp.pstats"'},
+            )
+
+    # Debug routes are only exposed when a token is configured
+    if DEBUG_TOKEN:
+        routes.append(Route("/debug/loop", endpoint=debug_loop, methods=["GET"]))
+        routes.append(Route("/debug/profile", endpoint=debug_profile, methods=["GET"]))
+
     middleware = [
         Middleware(
             CORSMiddleware,
@@ -222,44 +493,161 @@ async def create_app():
         )
     ]
 
+    if COMPRESSION_ENABLED:
+        middleware.append(
+            Middleware(
+                CompressionMiddleware,
+                minimum_size=COMPRESSION_MIN_SIZE,
+                gzip_level=COMPRESSION_GZIP_LEVEL,
+                brotli_quality=COMPRESSION_BROTLI_QUALITY,
+                compress_event_streams=COMPRESS_EVENT_STREAMS,
+            )
+        )
+
+    async def warm_caches():
+        """Prefetch caches in the background, retrying until they are warm, then report ready."""
+        started = time.monotonic()
+        retry_delay = 1.0
+        while True:
+            lifecycle.warmup_attempts += 1
+            try:
+                warmed = await asyncio.wait_for(warm_up(), timeout=WARMUP_TIMEOUT)
+            except Exception as e:
+                logging.warning(f"Cache warm-up failed: {e}")
+                warmed = False
+
+            if warmed:
+                break
+
+            # /readyz keeps answering 503; tool calls still work meanwhile,
+            # they just fetch on first use
+            logging.warning(f"Template catalogue not warmed, retrying in {retry_delay:.0f}s")
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, WARMUP_RETRY_MAX)
+
+        logging.info(f"Caches warmed in {time.monotonic() - started:.2f}s")
+        lifecycle.mark_ready()
+
     # Define lifespan for session manager
     @contextlib.asynccontextmanager
     async def lifespan(app):
         """Context manager for session manager."""
-        if session_manager is not None:
-            async with session_manager.run():
-                logging.info("Application started with StreamableHTTP session manager!")
-                try:
-                    yield
-                finally:
-                    logging.info("Application shutting down...")
-        else:
-            # No session manager, just yield
-            yield
+        # A restart runs on a fresh event loop; locks, queues and clients
+        # created on the previous one cannot be used from it
+        template_catalogue.reset()
+        api_key_pool.reset()
+        generation_scheduler.reset()
+        event_loop_monitor.start()
+        try:
+            if session_manager is not None:
+                async with session_manager.run():
+                    logging.info("Application started with StreamableHTTP session manager!")
+                    reaper_task = asyncio.create_task(session_reaper.run())
+                    warmup_task = asyncio.create_task(warm_caches())
+                    try:
+                        yield
+                    finally:
+                        logging.info("Application shutting down...")
+                        warmup_task.cancel()
+                        # Normally already drained on SIGTERM by DrainingServer
+                        if not lifecycle.draining:
+                            await lifecycle.drain(DRAIN_TIMEOUT)
+                        reaper_task.cancel()
+                        await api_key_pool.aclose()
+                        if shared_cache is not None:
+                            shared_cache.close()
+            else:
+                # No session manager, just yield
+                yield
+        finally:
+            await event_loop_monitor.stop()
 
     return Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
 
 
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn server that drains before shutting down.
+
+    On the first SIGTERM/SIGINT the server reports not ready and rejects new
+    tool calls, while in-flight ones get up to DRAIN_TIMEOUT seconds to
+    finish. Only then does uvicorn's own shutdown start. A second signal
+    stops waiting for the drain, a third skips waiting for connections.
+
+    Signals are handled here instead of being recorded for uvicorn, which
+    would re-raise them once serve() returns and kill the process before
+    atexit handlers (such as the log queue flush) run.
+    """
+
+    def __init__(self, config: uvicorn.Config):
+        super().__init__(config)
+        self._loop = None
+        self._draining = False
+        self._drain_task = None
+
+    async def serve(self, sockets=None):
+        self._loop = asyncio.get_running_loop()
+        await super().serve(sockets)
+
+    def handle_exit(self, sig, frame):
+        if self.should_exit:
+            self.force_exit = True
+            return
+        if self._loop is None or self._draining:
+            self.should_exit = True
+            return
+
+        # Runs in a signal handler: hand the drain over to the event loop
+        self._draining = True
+        self._loop.call_soon_threadsafe(self._start_drain)
+
+    def _start_drain(self):
+        self._drain_task = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        await lifecycle.drain(DRAIN_TIMEOUT)
+        self.should_exit = True
+
+
 async def start_server():
     """Start the server asynchronously."""
     app = await create_app()
-    logging.info(f"Starting server at {HOST}:{PORT}")
+    logging.info(f"Starting server at {HOST}:{PORT} ({time.monotonic() - lifecycle.started_at:.2f}s after startup)")
 
     # Use uvicorn's async API
-    config = uvicorn.Config(app, host=HOST, port=PORT)
-    server = uvicorn.Server(config)
+    # log_config=None lets uvicorn's loggers propagate to the queued root handler
+    config = uvicorn.Config(
+        app,
+        host=HOST,
+        port=PORT,
+        log_config=None,
+        # Streams still open after draining are closed after this many seconds
+        timeout_graceful_shutdown=SHUTDOWN_CONNECTION_TIMEOUT,
+    )
+    server = DrainingServer(config)
     await server.serve()
 
 
 
 if __name__ == "__main__":
+    restart_delay = 1.0
     while True:
+        started = time.monotonic()
         try:
             # Use asyncio.run to run the async start_server function
             asyncio.run(start_server())
+            logging.info("Server stopped")
+            break
         except KeyboardInterrupt:
             logging.info("Server stopped by user")
             break
         except Exception as e:
             logging.error(f"Server crashed with error: {e}")
-            continue
+
+        # Back off exponentially while the server keeps crashing right away
+        if time.monotonic() - started > RESTART_BACKOFF_MAX:
+            restart_delay = 1.0
+        logging.info(f"Restarting server in {restart_delay:.0f}s")
+        time.sleep(restart_delay)
+        restart_delay = min(restart_delay * 2, RESTART_BACKOFF_MAX)
+        lifecycle.reset()
@@ -0,0 +1,235 @@
+"""
+Pool of SlideSpeak API keys.
+
+Each key owns its own HTTP connection pool, rate limiter and usage counters,
+so throughput scales with the number of configured keys and tenants that
+bring their own key (via a request header) are isolated from each other.
+"""
+import time
+import asyncio
+import itertools
+import logging
+import contextlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import httpx
+
+from helper.config import (
+    SLIDESPEAK_API_KEYS,
+    API_KEY_SELECTION,
+    API_KEY_RATE_LIMIT,
+    API_KEY_BURST,
+    API_KEY_MAX_CONNECTIONS,
+    MAX_SESSION_API_KEYS,
+)
+
+USER_AGENT = "slidespeak-mcp/0.0.3"
+
+
+class RateLimiter:
+    """
+    Token bucket limiter. A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def reset(self) -> None:
+        """Recreate the lock for a new event loop."""
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ApiKey:
+    """
+    A single API key with its own connection pool, rate limiter and counters.
+    """
+
+    def __init__(self, key: str, source: str):
+        self.key = key
+        self.source = source  # "pool" or "session"
+        self.limiter = RateLimiter(API_KEY_RATE_LIMIT, API_KEY_BURST)
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.leases = 0  # Operations (e.g. a generation and its polling) holding the key
+        self.last_used: Optional[float] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def label(self) -> str:
+        """Masked key, safe to log."""
+        return f"{self.key[:4]}...{self.key[-4:]}" if len(self.key) > 8 else "****"
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """HTTP client bound to this key, created on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={
+                    "User-Agent": USER_AGENT,
+                    "Accept": "application/json",
+                    "X-API-Key": self.key,
+                },
+                limits=httpx.Limits(
+                    max_connections=API_KEY_MAX_CONNECTIONS,
+                    max_keepalive_connections=API_KEY_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    @property
+    def busy(self) -> bool:
+        """Whether a request is in flight or an operation holds a lease."""
+        return self.in_flight > 0 or self.leases > 0
+
+    @contextlib.contextmanager
+    def lease(self):
+        """Keep the key from being released while the block runs, including between requests."""
+        self.leases += 1
+        try:
+            yield self
+        finally:
+            self.leases -= 1
+
+    def record(self, success: bool) -> None:
+        """Update usage counters after a request."""
+        self.requests += 1
+        if not success:
+            self.errors += 1
+        self.last_used = time.time()
+
+    def reset(self) -> None:
+        """
+        Forget state bound to a previous event loop. A client that was not
+        closed on shutdown cannot be closed from the new loop, so it is
+        dropped and recreated on next use.
+        """
+        self.limiter.reset()
+        self._client = None
+        self.in_flight = 0
+        self.leases = 0
+
+    async def aclose(self) -> None:
+        """Close the connection pool; it is recreated on next use."""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "key": self.label,
+            "source": self.source,
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "leases": self.leases,
+            "last_used": self.last_used,
+        }
+
+
+class ApiKeyPool:
+    """
+    Selects an API key per request.
+
+    Configured keys are chosen round-robin or by fewest leases plus in-flight
+    requests.
+    A key supplied by the session bypasses the pool and gets its own entry,
+    kept in a bounded LRU so idle tenant keys are eventually released.
+    """
+
+    def __init__(self, keys: List[str], strategy: str = "round_robin", max_session_keys: int = 256):
+        self.keys = [ApiKey(key, "pool") for key in keys]
+        self.strategy = strategy
+        self.max_session_keys = max_session_keys
+        self._session_keys: OrderedDict[str, ApiKey] = OrderedDict()
+        self._round_robin = itertools.cycle(self.keys) if self.keys else None
+        self._closing: set[asyncio.Task] = set()  # Clients of released session keys being closed
+
+    def select(self, session_key: Optional[str] = None) -> Optional[ApiKey]:
+        """
+        Pick the key to use for a request.
+
+        Args:
+            session_key: Key supplied by the client session, if any.
+
+        Returns:
+            The selected ApiKey, or None if no key is available.
+        """
+        if session_key:
+            return self._session_key(session_key)
+
+        if not self.keys:
+            return None
+
+        if self.strategy == "least_loaded":
+            # A leased key is busy with a generation between its requests
+            return min(self.keys, key=lambda api_key: (api_key.leases + api_key.in_flight, api_key.requests))
+
+        return next(self._round_robin)
+
+    def _session_key(self, key: str) -> ApiKey:
+        api_key = self._session_keys.get(key)
+        if api_key is not None:
+            self._session_keys.move_to_end(key)
+            return api_key
+
+        api_key = ApiKey(key, "session")
+        self._session_keys[key] = api_key
+
+        # Release the least recently used idle session keys beyond the cap
+        if len(self._session_keys) > self.max_session_keys:
+            for old_key, old_api_key in list(self._session_keys.items()):
+                if len(self._session_keys) <= self.max_session_keys:
+                    break
+                if not old_api_key.busy and old_api_key is not api_key:
+                    del self._session_keys[old_key]
+                    task = asyncio.get_running_loop().create_task(old_api_key.aclose())
+                    self._closing.add(task)
+                    task.add_done_callback(self._closing.discard)
+
+        return api_key
+
+    def reset(self) -> None:
+        """Forget state bound to a previous event loop, before a restart."""
+        self._closing = set()
+        for api_key in [*self.keys, *self._session_keys.values()]:
+            api_key.reset()
+
+    async def aclose(self) -> None:
+        """Close every connection pool owned by the pool."""
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        for api_key in [*self.keys, *self._session_keys.values()]:
+            try:
+                await api_key.aclose()
+            except Exception as e:
+                logging.warning(f"Error closing HTTP client for key {api_key.label}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "keys": [api_key.stats() for api_key in self.keys],
+            "session_keys": [api_key.stats() for api_key in self._session_keys.values()],
+        }
+
+
+api_key_pool = ApiKeyPool(SLIDESPEAK_API_KEYS, API_KEY_SELECTION, MAX_SESSION_API_KEYS)
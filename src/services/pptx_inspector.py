@@ -0,0 +1,253 @@
+"""
+Streaming inspection of generated PowerPoint files.
+
+Reads only the zip central directory and the slide XML parts of a pptx,
+using HTTP range requests when the host supports them and a disk-backed
+spool otherwise, so memory use stays bounded regardless of deck size.
+"""
+import io
+import re
+import posixpath
+import asyncio
+import logging
+import tempfile
+import zipfile
+from typing import Any, Dict, List, Optional
+from xml.etree.ElementTree import iterparse
+import httpx
+
+from helper.config import PPTX_INSPECTION_TIMEOUT
+
+# Size of each ranged read; zipfile reads small headers and compressed chunks
+RANGE_BLOCK_SIZE = 64 * 1024
+# Full downloads (no range support) are kept in memory only up to this size
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+_SLIDE_PART = re.compile(r"^ppt/slides/slide(\d+)\.xml$")
+_CONTENT_RANGE = re.compile(r"^bytes \d+-\d+/(\d+)$")
+_NS_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_NS_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_NS_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_PRESENTATION_PART = "ppt/presentation.xml"
+_PRESENTATION_RELS = "ppt/_rels/presentation.xml.rels"
+_TITLE_PLACEHOLDERS = {"title", "ctrTitle"}
+
+
+class _HttpRangeFile(io.RawIOBase):
+    """
+    Seekable, read-only file object backed by HTTP range requests.
+    """
+
+    def __init__(self, client: httpx.Client, url: str, size: int):
+        self._client = client
+        self._url = url
+        self._size = size
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        if self._pos >= self._size or len(buffer) == 0:
+            return 0
+
+        end = min(self._pos + len(buffer), self._size) - 1
+        view = memoryview(buffer)
+        read = 0
+        # Streamed, so a server that ignores the range is rejected before
+        # its full-body reply is downloaded
+        with self._client.stream("GET", self._url, headers={"Range": f"bytes={self._pos}-{end}"}) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise IOError(f"Range request not honoured (status {response.status_code})")
+
+            for chunk in response.iter_bytes():
+                count = min(len(chunk), len(view) - read)
+                view[read:read + count] = chunk[:count]
+                read += count
+                if read == len(view):
+                    break
+
+        self._pos += read
+        return read
+
+
+def _spool(response: httpx.Response):
+    """
+    Stream a response body into a spooled temporary file that spills to disk
+    past SPOOL_MAX_MEMORY.
+
+    Returns:
+        A tuple of (file object, total size in bytes).
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    size = 0
+    for chunk in response.iter_bytes(RANGE_BLOCK_SIZE):
+        spool.write(chunk)
+        size += len(chunk)
+    spool.seek(0)
+    return spool, size
+
+
+def _open_remote(client: httpx.Client, url: str):
+    """
+    Open a remote pptx as a seekable binary file.
+
+    Probes with a one-byte range request; if the server answers 206 the file is
+    read lazily through range requests, otherwise the body is streamed into a
+    spooled temporary file that spills to disk past SPOOL_MAX_MEMORY.
+
+    Returns:
+        A tuple of (file object, total size in bytes).
+    """
+    with client.stream("GET", url, headers={"Range": "bytes=0-0"}) as response:
+        response.raise_for_status()
+
+        if response.status_code != 206:
+            # The server ignored the range header: the probe response is the
+            # full body
+            return _spool(response)
+
+        match = _CONTENT_RANGE.match(response.headers.get("content-range", ""))
+        if match:
+            size = int(match.group(1))
+            raw = _HttpRangeFile(client, url, size)
+            return io.BufferedReader(raw, buffer_size=RANGE_BLOCK_SIZE), size
+
+    # Ranges are supported but the total size is unknown (e.g. "bytes 0-0/*"),
+    # so download the whole body into the spool instead
+    with client.stream("GET", url) as response:
+        response.raise_for_status()
+        return _spool(response)
+
+
+def _read_slide_title(stream) -> Optional[str]:
+    """
+    Incrementally parse a slide XML part and return its title placeholder text.
+    """
+    in_shape = False
+    is_title = False
+    paragraphs: List[str] = []
+    current: List[str] = []
+
+    for event, elem in iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == f"{_NS_P}sp":
+                in_shape, is_title, paragraphs, current = True, False, [], []
+            elif in_shape and tag == f"{_NS_P}ph" and elem.get("type") in _TITLE_PLACEHOLDERS:
+                is_title = True
+            continue
+
+        if in_shape and tag == f"{_NS_A}t" and elem.text:
+            current.append(elem.text)
+        elif in_shape and tag == f"{_NS_A}p":
+            if current:
+                paragraphs.append("".join(current))
+            current = []
+        elif tag == f"{_NS_P}sp":
+            if is_title and paragraphs:
+                return " ".join(paragraphs).strip()
+            in_shape = False
+
+        # Drop parsed content so memory stays flat for large slides
+        elem.clear()
+
+    return None
+
+
+def _slide_order(archive: zipfile.ZipFile) -> List[str]:
+    """
+    Return the slide part names in presentation order.
+
+    The order comes from the slide ID list in ppt/presentation.xml, resolved
+    through its relationships; part numbers (slide3.xml) do not change when
+    slides are reordered. Falls back to part-number order if either part is
+    missing or unreadable.
+    """
+    names = set(archive.namelist())
+    try:
+        targets = {}
+        with archive.open(_PRESENTATION_RELS) as stream:
+            for _, elem in iterparse(stream):
+                if elem.tag == f"{_NS_REL}Relationship" and elem.get("TargetMode") != "External":
+                    target = elem.get("Target", "")
+                    part = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("ppt", target))
+                    targets[elem.get("Id")] = part
+
+        order = []
+        with archive.open(_PRESENTATION_PART) as stream:
+            for _, elem in iterparse(stream):
+                if elem.tag == f"{_NS_P}sldId":
+                    part = targets.get(elem.get(f"{_NS_R}id"))
+                    if part in names:
+                        order.append(part)
+                elif elem.tag == f"{_NS_P}sldIdLst":
+                    return order
+                # The slide list precedes the large parts of the document
+                elem.clear()
+    except (KeyError, SyntaxError) as e:
+        logging.debug(f"Falling back to part-number slide order: {str(e)}")
+
+    numbered = []
+    for name in names:
+        match = _SLIDE_PART.match(name)
+        if match:
+            numbered.append((int(match.group(1)), name))
+    return [name for _, name in sorted(numbered)]
+
+
+def _inspect_sync(url: str) -> Dict[str, Any]:
+    """Blocking implementation of inspect_presentation."""
+    with httpx.Client(timeout=PPTX_INSPECTION_TIMEOUT, follow_redirects=True) as client:
+        file_obj, size = _open_remote(client, url)
+        with file_obj, zipfile.ZipFile(file_obj) as archive:
+            slides = []
+            for index, name in enumerate(_slide_order(archive), start=1):
+                with archive.open(name) as stream:
+                    slides.append({"index": index, "title": _read_slide_title(stream)})
+
+    return {
+        "slide_count": len(slides),
+        "file_size_bytes": size,
+        "slides": slides,
+    }
+
+
+async def inspect_presentation(url: str) -> Optional[Dict[str, Any]]:
+    """
+    Summarize a generated presentation without buffering the whole file.
+
+    Args:
+        url: Download URL of the generated pptx.
+
+    Returns:
+        A dictionary with slide count, file size and per-slide titles, or None
+        if the file could not be read.
+    """
+    try:
+        return await asyncio.to_thread(_inspect_sync, url)
+    except (httpx.HTTPError, zipfile.BadZipFile, IOError) as e:
+        logging.warning(f"Unable to inspect presentation at {url}: {str(e)}")
+    except Exception as e:
+        logging.error(f"An unexpected error occurred inspecting presentation at {url}: {str(e)}")
+
+    return None
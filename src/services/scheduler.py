@@ -0,0 +1,201 @@
+"""
+Fair scheduling of upstream generation slots across MCP sessions.
+
+Generation requests are queued per session and granted with fair queuing,
+so a burst from one session cannot starve the others. A global cap
+bounds concurrent generations and a per-session cap bounds how many of them
+a single session may hold.
+"""
+import time
+import asyncio
+import logging
+import contextlib
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Dict, Optional
+
+from helper.config import MAX_CONCURRENT_GENERATIONS, MAX_GENERATIONS_PER_SESSION, SCHEDULER_STATS_MAX_SESSIONS
+
+ANONYMOUS_SESSION = "anonymous"
+
+
+class _Waiter:
+    __slots__ = ("start_tag", "finish_tag", "future", "enqueued_at")
+
+    def __init__(self, start_tag: float, finish_tag: float, future: asyncio.Future):
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class _SessionState:
+    __slots__ = ("queue", "in_flight", "last_finish")
+
+    def __init__(self):
+        self.queue: deque[_Waiter] = deque()
+        self.in_flight = 0
+        self.last_finish = 0.0  # Finish tag of the most recently queued request
+
+
+class _SessionStats:
+    __slots__ = ("served", "total_wait", "max_wait")
+
+    def __init__(self):
+        self.served = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class GenerationScheduler:
+    """
+    Fair queuing scheduler for generation slots.
+
+    Each request gets a virtual finish tag of max(virtual time, session's last
+    finish tag) + 1; free slots go to the smallest tag among sessions that are
+    below their in-flight cap.
+
+    Queue state is dropped as soon as a session is idle, while wait time
+    statistics are kept for the `max_stats_sessions` most recently served
+    sessions.
+    """
+
+    def __init__(self, max_concurrent: int, max_per_session: int, max_stats_sessions: int = 1000):
+        self.max_concurrent = max(max_concurrent, 1)
+        self.max_per_session = max(max_per_session, 1)
+        self.max_stats_sessions = max(max_stats_sessions, 0)
+        self.in_flight = 0
+        self._virtual_time = 0.0
+        self._sessions: Dict[str, _SessionState] = {}
+        self._stats: OrderedDict[str, _SessionStats] = OrderedDict()
+
+    def reset(self) -> None:
+        """Drop queues and slots left over from a previous event loop."""
+        self.in_flight = 0
+        self._virtual_time = 0.0
+        self._sessions = {}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, session_id: Optional[str]) -> AsyncIterator[None]:
+        """
+        Hold a generation slot for the duration of the block.
+
+        Args:
+            session_id: MCP session the request belongs to.
+        """
+        session_id = session_id or ANONYMOUS_SESSION
+        await self._acquire(session_id)
+        try:
+            yield
+        finally:
+            self._release(session_id)
+
+    async def _acquire(self, session_id: str) -> None:
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._sessions[session_id] = _SessionState()
+
+        start_tag = max(self._virtual_time, state.last_finish)
+        finish_tag = start_tag + 1.0
+        state.last_finish = finish_tag
+        waiter = _Waiter(start_tag, finish_tag, asyncio.get_running_loop().create_future())
+        state.queue.append(waiter)
+        self._dispatch()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was granted just as the caller was cancelled
+                self._release(session_id)
+            else:
+                # _dispatch may already have dropped the cancelled waiter
+                if waiter in state.queue:
+                    state.queue.remove(waiter)
+                self._forget_if_idle(session_id)
+            raise
+
+        wait = time.monotonic() - waiter.enqueued_at
+        self._record_wait(session_id, wait)
+        if wait > 1.0:
+            logging.info(f"Generation slot granted after waiting {wait:.1f}s")
+
+    def _record_wait(self, session_id: str, wait: float) -> None:
+        if self.max_stats_sessions == 0:
+            return
+        stats = self._stats.get(session_id)
+        if stats is None:
+            stats = self._stats[session_id] = _SessionStats()
+        else:
+            self._stats.move_to_end(session_id)
+        stats.served += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        while len(self._stats) > self.max_stats_sessions:
+            self._stats.popitem(last=False)
+
+    def _release(self, session_id: str) -> None:
+        state = self._sessions[session_id]
+        state.in_flight -= 1
+        self.in_flight -= 1
+        self._forget_if_idle(session_id)
+        self._dispatch()
+
+    def _forget_if_idle(self, session_id: str) -> None:
+        state = self._sessions.get(session_id)
+        if state is not None and not state.queue and state.in_flight == 0:
+            del self._sessions[session_id]
+
+    def _dispatch(self) -> None:
+        """Grant free slots to the eligible waiters with the smallest finish tags."""
+        while self.in_flight < self.max_concurrent:
+            best_state: Optional[_SessionState] = None
+            for state in self._sessions.values():
+                # Drop waiters cancelled since they were queued; granting
+                # them would leak the slot
+                while state.queue and state.queue[0].future.done():
+                    state.queue.popleft()
+                if not state.queue or state.in_flight >= self.max_per_session:
+                    continue
+                if best_state is None or state.queue[0].finish_tag < best_state.queue[0].finish_tag:
+                    best_state = state
+
+            if best_state is None:
+                return
+
+            waiter = best_state.queue.popleft()
+            best_state.in_flight += 1
+            self.in_flight += 1
+            # Virtual time follows the start tag of the request entering service
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            waiter.future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and in-flight count per active session, and wait times per recently served session."""
+        now = time.monotonic()
+        empty_state, empty_stats = _SessionState(), _SessionStats()
+        sessions = {}
+        for session_id in [*self._stats, *(key for key in self._sessions if key not in self._stats)]:
+            state = self._sessions.get(session_id, empty_state)
+            stats = self._stats.get(session_id, empty_stats)
+            # Session IDs authorize requests, so only expose a prefix
+            sessions[session_id[:8]] = {
+                "queued": len(state.queue),
+                "in_flight": state.in_flight,
+                "served": stats.served,
+                "avg_wait_seconds": round(stats.total_wait / stats.served, 3) if stats.served else 0.0,
+                "max_wait_seconds": round(stats.max_wait, 3),
+                "oldest_queued_seconds": round(now - state.queue[0].enqueued_at, 3) if state.queue else 0.0,
+            }
+
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_per_session": self.max_per_session,
+            "in_flight": self.in_flight,
+            "queued": sum(len(state.queue) for state in self._sessions.values()),
+            "sessions": sessions,
+        }
+
+
+generation_scheduler = GenerationScheduler(
+    MAX_CONCURRENT_GENERATIONS, MAX_GENERATIONS_PER_SESSION, SCHEDULER_STATS_MAX_SESSIONS
+)
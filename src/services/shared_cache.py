@@ -0,0 +1,171 @@
+"""
+Two-tier cache shared by all server processes on a host.
+
+L1 is a small in-process dict with a short TTL; L2 is a SQLite key-value
+store (WAL mode) that every local worker opens, so template catalogues and
+completed generations fetched by one worker are reused by the others.
+"""
+import os
+import json
+import stat
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from helper.config import SHARED_CACHE_PATH, L1_CACHE_TTL, L1_CACHE_MAX_ENTRIES
+
+# Expired rows are purged every this many writes
+PURGE_EVERY = 100
+
+
+class SharedCache:
+    """
+    SQLite-backed key-value store with per-entry expiry.
+
+    Values are JSON-encoded. Writes are single upserts, so concurrent workers
+    always see either the old or the new value. Any database, filesystem or
+    decoding error is logged and treated as a cache miss; if the database
+    cannot be opened at all, the cache disables itself.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.disabled = False
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _secure_path(self) -> None:
+        """
+        Create the database file readable and writable by the current user
+        only, and refuse a file someone else could have written cached
+        values (e.g. pptx URLs) into.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        os.close(os.open(self.path, os.O_CREAT | os.O_RDWR, 0o600))
+
+        info = os.stat(self.path)
+        if hasattr(os, "getuid") and info.st_uid != os.getuid():
+            raise sqlite3.OperationalError(f"{self.path} is not owned by the current user")
+        if info.st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+            os.chmod(self.path, 0o600)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            try:
+                self._secure_path()
+                connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+            except (sqlite3.Error, OSError) as e:
+                # Don't retry the filesystem (and log) on every call
+                self.disabled = True
+                logging.warning(f"Shared cache at {self.path} disabled: {str(e)}")
+                raise
+            self._connection = connection
+        return self._connection
+
+    def get_sync(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, expires_at) for a live entry, or None."""
+        if self.disabled:
+            return None
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+                ).fetchone()
+            return (json.loads(row[0]), row[1]) if row else None
+        except (sqlite3.Error, OSError, ValueError) as e:
+            if not self.disabled:
+                logging.warning(f"Shared cache read failed for {key}: {str(e)}")
+            return None
+
+    def set_sync(self, key: str, value: Any, ttl: float) -> None:
+        """Store value under key for ttl seconds."""
+        if self.disabled:
+            return
+        encoded = json.dumps(value, separators=(",", ":"))
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                    (key, encoded, now + ttl),
+                )
+                self._writes += 1
+                if self._writes % PURGE_EVERY == 0:
+                    connection.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        except (sqlite3.Error, OSError) as e:
+            if not self.disabled:
+                logging.warning(f"Shared cache write failed for {key}: {str(e)}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class TieredCache:
+    """
+    In-process L1 in front of an optional SharedCache L2.
+
+    L1 entries live for at most `l1_ttl` seconds (and never beyond the L2
+    expiry), which bounds how stale a worker can be relative to the others.
+    """
+
+    def __init__(self, shared: Optional[SharedCache], l1_ttl: float, l1_max_entries: int):
+        self.shared = shared
+        self.l1_ttl = l1_ttl
+        self.l1_max_entries = l1_max_entries
+        # key -> (value, expires_at as wall-clock time)
+        self._l1: OrderedDict[str, Tuple[Any, float]] = OrderedDict()
+
+    def _l1_put(self, key: str, value: Any, expires_at: float) -> None:
+        self._l1[key] = (value, min(expires_at, time.time() + self.l1_ttl))
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.l1_max_entries:
+            self._l1.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss."""
+        entry = self._l1.get(key)
+        if entry is not None:
+            if entry[1] > time.time():
+                return entry[0]
+            del self._l1[key]
+
+        if self.shared is None or self.shared.disabled:
+            return None
+
+        entry = await asyncio.to_thread(self.shared.get_sync, key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        self._l1_put(key, value, expires_at)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store value in both tiers for ttl seconds."""
+        if ttl <= 0:
+            return
+
+        self._l1_put(key, value, time.time() + ttl)
+        if self.shared is not None and not self.shared.disabled:
+            await asyncio.to_thread(self.shared.set_sync, key, value, ttl)
+
+
+shared_cache = SharedCache(SHARED_CACHE_PATH) if SHARED_CACHE_PATH else None
+cache = TieredCache(shared_cache, L1_CACHE_TTL, L1_CACHE_MAX_ENTRIES)
@@ -1,14 +1,20 @@
 import os
+import json
 import time
 import asyncio
+import hashlib
 import logging
-from helper.config import SLIDESPEAK_API_KEY
+from helper.logger import log_sampled, sampler
+from helper.config import PPTX_INSPECTION_ENABLED, GENERATION_CACHE_TTL
+from services.api_key_pool import ApiKey, api_key_pool
+from services.pptx_inspector import inspect_presentation
+from services.shared_cache import cache
+from services.template_catalogue import template_catalogue, encode_cursor, decode_cursor
 from typing import Any, Optional, Literal, List, Dict
 import httpx
 
 # API Configuration
 API_BASE = "https://api.slidespeak.co/api/v1"
-USER_AGENT = "slidespeak-mcp/0.0.3"
 
 # Default Timeouts
 DEFAULT_TIMEOUT = 30.0
@@ -16,11 +22,14 @@ GENERATION_TIMEOUT = 90.0  # Total time allowed for generation + polling
 POLLING_INTERVAL = 2.0  # Seconds between status checks
 POLLING_TIMEOUT = 10.0  # Timeout for each individual status check request
 
+DEFAULT_SEARCH_LIMIT = 5  # Matches returned by search_templates when no limit is given
+
 async def _make_api_request(
     method: Literal["GET", "POST"],
     endpoint: str,
     payload: Optional[Dict[str, Any]] = None,
     timeout: float = DEFAULT_TIMEOUT,
+    api_key: Optional[ApiKey] = None,
 ) -> Optional[Dict[str, Any]]:
     """
     Makes an HTTP request to the SlideSpeak API.
@@ -30,216 +39,308 @@ async def _make_api_request(
         endpoint: API endpoint path (e.g., '/presentation/templates').
         payload: JSON payload for POST requests. Ignored for GET.
         timeout: Request timeout in seconds.
+        api_key: Key to send the request with. Selected from the pool if omitted.
 
     Returns:
         The parsed JSON response as a dictionary on success, None on failure.
     """
-    api_key = SLIDESPEAK_API_KEY
+    if api_key is None:
+        api_key = api_key_pool.select()
 
-    if not api_key:
+    if api_key is None:
         logging.error("API Key is missing. Cannot make API request.")
         return None
 
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "application/json",
-        "X-API-Key": api_key,
-    }
-
     # Construct full URL
     url = f"{API_BASE}{endpoint}"
 
-    async with httpx.AsyncClient() as client:
-        try:
-            if method == "POST":
-                response = await client.post(url, json=payload, headers=headers, timeout=timeout)
-            else:  # Default to GET
-                response = await client.get(url, headers=headers, timeout=timeout)
-
-            response.raise_for_status()  # Raise exception for 4xx or 5xx status codes
-            return response.json()
-
-        except httpx.HTTPStatusError as e:
-            logging.error(f"HTTP error calling {method} {url}: {e.response.status_code} - {e.response.text}")
-        except httpx.RequestError as e:
-            logging.error(f"Request error calling {method} {url}: {str(e)}")
-        except Exception as e:
-            logging.error(f"An unexpected error occurred calling {method} {url}: {str(e)}")
+    await api_key.limiter.acquire()
+    api_key.in_flight += 1
+    success = False
+    try:
+        if method == "POST":
+            response = await api_key.client.post(url, json=payload, timeout=timeout)
+        else:  # Default to GET
+            response = await api_key.client.get(url, timeout=timeout)
+
+        response.raise_for_status()  # Raise exception for 4xx or 5xx status codes
+        result = response.json()
+        success = True
+        return result
+
+    except httpx.HTTPStatusError as e:
+        logging.error(f"HTTP error calling {method} {url} with key {api_key.label}: {e.response.status_code} - {e.response.text}")
+    except httpx.RequestError as e:
+        logging.error(f"Request error calling {method} {url} with key {api_key.label}: {str(e)}")
+    except Exception as e:
+        logging.error(f"An unexpected error occurred calling {method} {url} with key {api_key.label}: {str(e)}")
+    finally:
+        api_key.in_flight -= 1
+        api_key.record(success)
+
+    return None
+
+async def _summarize_task_result(task_result: Any) -> Optional[Dict[str, Any]]:
+    """Inspect the generated pptx referenced by a task result, if enabled."""
+    if not PPTX_INSPECTION_ENABLED or not isinstance(task_result, dict):
+        return None
 
+    url = task_result.get("url")
+    if not url:
         return None
 
-async def get_available_templates(limit: Optional[int] = None) -> Dict[str, Any]:
-    """Get all available presentation templates with optional limit."""
+    return await inspect_presentation(url)
+
+async def _get_template_catalogue(api_key: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """Return the cached template catalogue, fetching it if stale."""
     templates_endpoint = "/presentation/templates"
 
-    templates_data = await _make_api_request("GET", templates_endpoint)
+    return await template_catalogue.get(
+        lambda: _make_api_request("GET", templates_endpoint, api_key=api_key_pool.select(api_key))
+    )
 
-    if not templates_data:
-        return {"message": "Unable to fetch templates due to an API error. Check server logs.", "is_error": True}
+async def warm_up() -> bool:
+    """
+    Prefetch the template catalogue so the first tool calls are served from
+    cache. This also loads the shared cache and opens the connection pool of
+    the default API key.
+
+    Returns:
+        True if the catalogue is available, or if there is no server API key
+        to fetch it with (clients then bring their own keys).
+    """
+    if not api_key_pool.keys:
+        return True
+    return await _get_template_catalogue() is not None
+
+def _template_info(template: Dict[str, Any]) -> Dict[str, Any]:
+    """Public fields of a catalogue entry."""
+    return {"name": template["name"], "cover": template["cover"], "content": template["content"]}
+
+async def get_available_templates(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    api_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Get available presentation templates, one page at a time.
+
+    Args:
+        limit: Maximum number of templates to return. All remaining if omitted.
+        cursor: `next_cursor` from a previous page. Pages are served from the
+            catalogue version the listing started on, even across refreshes.
+        api_key: Key supplied by the client session, if any.
+    """
+    templates_data = await _get_template_catalogue(api_key)
+
+    if templates_data is None:
+        return {"message": template_catalogue.error, "is_error": True}
 
-    if not isinstance(templates_data, list):
-        return {"message": f"Unexpected response format received for templates: {type(templates_data).__name__}", "is_error": True}
+    version, offset = template_catalogue.version, 0
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return {"message": "Invalid cursor. Start again without a cursor.", "is_error": True}
+        version, offset = position
+        templates_data = template_catalogue.snapshot(version)
+        if templates_data is None:
+            return {"message": "Cursor has expired because the template catalogue changed. Start again without a cursor.", "is_error": True}
 
     if not templates_data:
         return {"message": "No templates available.", "is_error": False}
 
     # Store total count before applying limit
     total_available = len(templates_data)
-    
-    # Apply limit if specified
+    offset = min(offset, total_available)
+
+    end = total_available
     if limit is not None and limit > 0:
-        templates_data = templates_data[:limit]
+        end = min(offset + limit, total_available)
 
-    formatted_templates = "Available templates:\n"
-    for template in templates_data:
-        # Add more robust checking for expected keys
-        name = template.get("name", "default")
-        images = template.get("images", {})
-        cover = images.get("cover", "No cover image URL")
-        content = images.get("content", "No content image URL")
-        formatted_templates += f"- {name}\n  Cover: {cover}\n  Content: {content}\n\n"
+    templates = [_template_info(template) for template in templates_data[offset:end]]
 
-    # Add limit info to the message if limit was applied
-    if limit is not None and limit > 0 and total_available > limit:
-        formatted_templates += f"\n(Showing {len(templates_data)} of {total_available} templates, limited by input parameter)"
+    if end < total_available:
+        message = f"Templates {offset + 1}-{end} of {total_available}. Pass next_cursor to get more."
+    elif offset:
+        message = f"Templates {offset + 1}-{end} of {total_available} (last page)."
+    else:
+        message = f"Available templates: {len(templates)}"
 
-    return {"message": formatted_templates.strip(), "is_error": False}
+    result = {"message": message, "is_error": False, "templates": templates, "total": total_available, "version": version}
+    if end < total_available:
+        result["next_cursor"] = encode_cursor(version, end)
 
-async def generate_powerpoint(plain_text: str, length: int, template: str) -> Dict[str, Any]:
-    """
-    Generate a PowerPoint presentation based on text, length, and template.
-    Waits up to a configured time for the result.
-    """
-    generation_endpoint = "/presentation/generate"
-    status_endpoint_base = "/task_status"  # Base path for status checks
+    return result
 
-    # Prepare the JSON body for the generation request
-    payload = {
-        "plain_text": plain_text,
-        "length": length,
-        "template": template
-    }
+async def search_templates(query: str, limit: Optional[int] = None, api_key: Optional[str] = None) -> Dict[str, Any]:
+    """Search the template catalogue by name and metadata, returning the best matches."""
+    templates_data = await _get_template_catalogue(api_key)
 
-    # Step 1: Initiate generation (POST request)
-    init_result = await _make_api_request("POST", generation_endpoint, payload=payload, timeout=GENERATION_TIMEOUT)
+    if templates_data is None:
+        return {"message": template_catalogue.error, "is_error": True}
 
-    if not init_result:
-        return {"message": "Failed to initiate PowerPoint generation due to an API error. Check server logs.", "is_error": True}
+    limit = limit if limit is not None and limit > 0 else DEFAULT_SEARCH_LIMIT
+    by_name = {template["name"]: template for template in templates_data}
+    matches = [
+        {**_template_info(by_name[name]), "score": score}
+        for name, score in template_catalogue.index.search(query, limit)
+        if name in by_name
+    ]
+
+    if not matches:
+        return {"message": f"No templates match '{query}'.", "is_error": False, "matches": [], "total": len(templates_data)}
 
-    task_id = init_result.get("task_id")
-    if not task_id:
-        return {"message": f"Failed to initiate PowerPoint generation. API response did not contain a task ID. Response: {init_result}", "is_error": True}
+    return {
+        "message": f"Found {len(matches)} matching templates. Use the template name when generating.",
+        "is_error": False,
+        "matches": matches,
+        "total": len(templates_data),
+    }
 
-    logging.info(f"PowerPoint generation initiated. Task ID: {task_id}")
+async def _wait_for_task(task_id: str, submitted_at: float, api_key: ApiKey) -> Dict[str, Any]:
+    """
+    Poll the status endpoint until a generation task succeeds or fails.
 
-    # Step 2: Poll for the task status
-    status_endpoint = f"{status_endpoint_base}/{task_id}"
-    final_result = None
+    Args:
+        task_id: Task ID returned by the generation endpoint.
+        submitted_at: Unix timestamp at which the generation request was sent.
+        api_key: Key the task was submitted with.
+
+    Returns:
+        A structured generation result (see GENERATION_RESULT_SCHEMA in constants/schema.py).
+    """
+    status_endpoint = f"/task_status/{task_id}"
+    poll_log_key = f"poll:{task_id}"
+    log_extra = {"task_id": task_id}
+    polls = 0
+
+    def timings() -> Dict[str, Any]:
+        completed_at = time.time()
+        return {
+            "submitted_at": submitted_at,
+            "completed_at": completed_at,
+            "elapsed_seconds": round(completed_at - submitted_at, 3),
+            "polls": polls,
+        }
 
     while True:
-        logging.debug(f"Polling status for task {task_id}...")
-        status_result = await _make_api_request("GET", status_endpoint, timeout=POLLING_TIMEOUT)
-        logging.info(status_result)
+        status_result = await _make_api_request("GET", status_endpoint, timeout=POLLING_TIMEOUT, api_key=api_key)
+        polls += 1
 
         if status_result:
             task_status = status_result.get("task_status")
             task_result = status_result.get("task_result")  # Assuming result might be here
 
             if task_status == "SUCCESS":
-                logging.info(f"Task {task_id} completed successfully.")
-                # Prefer task_result if available, otherwise return the whole status dict as string
-                final_result = str(task_result) if task_result else str(status_result)
-                final_result = f"Make sure to return the pptx url to the user if available. Here is the result: {final_result}"
-                break
+                sampler.forget(poll_log_key)
+                logging.info(f"Task {task_id} completed successfully after {polls} polls.", extra=log_extra)
+                result = {
+                    "message": "PowerPoint generated successfully. Make sure to return the pptx url to the user.",
+                    "is_error": False,
+                    "task_id": task_id,
+                    "status": task_status,
+                    "pptx_url": task_result.get("url") if isinstance(task_result, dict) else None,
+                    "timings": timings(),
+                }
+                summary = await _summarize_task_result(task_result)
+                if summary:
+                    result["summary"] = summary
+                return result
             elif task_status in ["FAILED", "FAILURE"]:  # Use 'FAILED' consistently if possible in API
-                logging.error(f"Task {task_id} failed. Status response: {status_result}")
+                sampler.forget(poll_log_key)
+                logging.error(f"Task {task_id} failed. Status response: {status_result}", extra=log_extra)
                 error_message = task_result.get("error", "Unknown error") if isinstance(task_result, dict) else "Unknown error"
-                final_result = f"PowerPoint generation failed for task {task_id}. Reason: {error_message}"
-                break
+                return {
+                    "message": f"PowerPoint generation failed for task {task_id}. Reason: {error_message}",
+                    "is_error": True,
+                    "task_id": task_id,
+                    "status": task_status,
+                    "timings": timings(),
+                }
             elif task_status in ["PENDING", "PROCESSING"]:  # Add other intermediate states if known
-                logging.debug(f"Task {task_id} status: {task_status}. Waiting...")
+                log_sampled(poll_log_key, logging.INFO, f"Task {task_id} status: {task_status}. Waiting...", extra=log_extra)
             else:
-                logging.warning(f"Task {task_id} has unknown status: {task_status}. Response: {status_result}")
+                log_sampled(poll_log_key, logging.WARNING, f"Task {task_id} has unknown status: {task_status}. Response: {status_result}", extra=log_extra)
                 # Continue polling, but log this unexpected state
 
         else:
             # Failure during polling
-            logging.warning(f"Failed to get status for task {task_id} during polling. Will retry.")
+            log_sampled(poll_log_key, logging.WARNING, f"Failed to get status for task {task_id} during polling. Will retry.", extra=log_extra)
             # Optionally add a counter to break after several consecutive polling failures
 
         await asyncio.sleep(POLLING_INTERVAL)  # Use asyncio.sleep in async functions
 
-    # After loop: check if we got a result or timed out
-    if final_result:
-        return {"message": final_result, "is_error": False}
-    else:
-        logging.warning(f"Timeout ({GENERATION_TIMEOUT}s) while waiting for PowerPoint generation task {task_id}.")
-        return {"message": f"Timeout while waiting for PowerPoint generation (Task ID: {task_id}). The task might still be running.", "is_error": True}
-
-async def generate_powerpoint_slide_by_slide(slides: List[Dict[str, Any]], template: str) -> Dict[str, Any]:
+async def _generate(endpoint: str, payload: Dict[str, Any], api_key: Optional[str] = None) -> Dict[str, Any]:
     """
-    Generate a PowerPoint presentation slide by slide based on slides array and template.
-    Waits up to a configured time for the result.
+    Submit a generation request and wait for the resulting task to finish.
+
+    Args:
+        endpoint: Generation endpoint path.
+        payload: JSON body for the generation request.
+        api_key: Key supplied by the client session, if any.
+
+    Returns:
+        A structured generation result (see GENERATION_RESULT_SCHEMA in constants/schema.py).
     """
-    generation_endpoint = "/presentation/generate/slide-by-slide"
-    status_endpoint_base = "/task_status"  # Base path for status checks
+    submitted_at = time.time()
+    # Status checks must use the key the task was submitted with
+    selected_key = api_key_pool.select(api_key)
+    if selected_key is None:
+        logging.error("API Key is missing. Cannot generate a presentation.")
+        return {"message": "Failed to initiate PowerPoint generation due to an API error. Check server logs.", "is_error": True}
 
+    # Hold the key for the whole generation, so it is not released between status polls
+    with selected_key.lease():
+        # Identical requests from the same key reuse a completed generation
+        cache_key = None
+        if GENERATION_CACHE_TTL > 0:
+            request_hash = hashlib.sha256(json.dumps([selected_key.key, endpoint, payload], sort_keys=True).encode("utf-8"))
+            cache_key = f"generation:{request_hash.hexdigest()}"
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                logging.info(f"Reusing cached generation for task {cached.get('task_id')}", extra={"task_id": cached.get("task_id")})
+                return {**cached, "cached": True}
+
+        # Step 1: Initiate generation (POST request)
+        init_result = await _make_api_request("POST", endpoint, payload=payload, timeout=GENERATION_TIMEOUT, api_key=selected_key)
+        if not init_result:
+            return {"message": "Failed to initiate PowerPoint generation due to an API error. Check server logs.", "is_error": True}
+
+        task_id = init_result.get("task_id")
+        if not task_id:
+            return {"message": f"Failed to initiate PowerPoint generation. API response did not contain a task ID. Response: {init_result}", "is_error": True}
+
+        logging.info(f"PowerPoint generation initiated. Task ID: {task_id}", extra={"task_id": task_id})
+
+        # Step 2: Poll for the task status
+        result = await _wait_for_task(task_id, submitted_at, selected_key)
+        if cache_key and not result["is_error"]:
+            await cache.set(cache_key, result, GENERATION_CACHE_TTL)
+        return result
+
+async def generate_powerpoint(plain_text: str, length: int, template: str, api_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate a PowerPoint presentation based on text, length, and template.
+    Waits for the generation task to finish.
+    """
     # Prepare the JSON body for the generation request
     payload = {
-        "slides": slides,
+        "plain_text": plain_text,
+        "length": length,
         "template": template
     }
 
-    # Step 1: Initiate generation (POST request)
-    init_result = await _make_api_request("POST", generation_endpoint, payload=payload, timeout=GENERATION_TIMEOUT)
-    if not init_result:
-        return {"message": "Failed to initiate PowerPoint generation due to an API error. Check server logs.", "is_error": True}
-
-    task_id = init_result.get("task_id")
-    if not task_id:
-        return {"message": f"Failed to initiate PowerPoint generation. API response did not contain a task ID. Response: {init_result}", "is_error": True}
-
-    logging.info(f"PowerPoint generation initiated. Task ID: {task_id}")
-
-    # Step 2: Poll for the task status
-    status_endpoint = f"{status_endpoint_base}/{task_id}"
-    final_result = None
-
-    while True:
-        logging.debug(f"Polling status for task {task_id}...")
-        status_result = await _make_api_request("GET", status_endpoint, timeout=POLLING_TIMEOUT)
-
-        if status_result:
-            task_status = status_result.get("task_status")
-            task_result = status_result.get("task_result")  # Assuming result might be here
-
-            if task_status == "SUCCESS":
-                logging.info(f"Task {task_id} completed successfully.")
-                # Prefer task_result if available, otherwise return the whole status dict as string
-                final_result = str(task_result) if task_result else str(status_result)
-                final_result = f"Make sure to return the pptx url to the user if available. Here is the result: {final_result}"
-                break
-            elif task_status in ["FAILED", "FAILURE"] :  # Use 'FAILED' consistently if possible in API
-                logging.error(f"Task {task_id} failed. Status response: {status_result}")
-                error_message = task_result.get("error", "Unknown error") if isinstance(task_result, dict) else "Unknown error"
-                final_result = f"PowerPoint generation failed for task {task_id}. Reason: {error_message}"
-                break
-            elif task_status in ["PENDING", "PROCESSING"]:  # Add other intermediate states if known
-                logging.debug(f"Task {task_id} status: {task_status}. Waiting...")
-            else:
-                logging.warning(f"Task {task_id} has unknown status: {task_status}. Response: {status_result}")
-                # Continue polling, but log this unexpected state
-
-        else:
-            # Failure during polling
-            logging.warning(f"Failed to get status for task {task_id} during polling. Will retry.")
-            # Optionally add a counter to break after several consecutive polling failures
+    return await _generate("/presentation/generate", payload, api_key)
 
-        await asyncio.sleep(POLLING_INTERVAL)  # Use asyncio.sleep in async functions
+async def generate_powerpoint_slide_by_slide(slides: List[Dict[str, Any]], template: str, api_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate a PowerPoint presentation slide by slide based on slides array and template.
+    Waits for the generation task to finish.
+    """
+    # Prepare the JSON body for the generation request
+    payload = {
+        "slides": slides,
+        "template": template
+    }
 
-    # After loop: check if we got a result or timed out
-    if final_result:
-        return {"message": final_result, "is_error": False}
-    else:
-        logging.warning(f"Timeout ({GENERATION_TIMEOUT}s) while waiting for PowerPoint generation task {task_id}.")
-        return {"message": f"Timeout while waiting for PowerPoint generation (Task ID: {task_id}). The task might still be running.", "is_error": True}
\ No newline at end of file
+    return await _generate("/presentation/generate/slide-by-slide", payload, api_key)
@@ -0,0 +1,152 @@
+"""
+Cached SlideSpeak template catalogue and its search index.
+"""
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from helper.config import TEMPLATE_CACHE_TTL
+from services.template_index import TemplateIndex
+from services.shared_cache import cache
+
+CACHE_KEY = "templates:catalogue"
+
+# Number of past catalogue versions kept so open cursors survive refreshes
+MAX_SNAPSHOTS = 4
+
+
+def normalize_template(template: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten an upstream template entry, keeping searchable metadata."""
+    images = template.get("images") or {}
+    normalized = {
+        "name": template.get("name", "default"),
+        "cover": images.get("cover"),
+        "content": images.get("content"),
+    }
+    for field, value in template.items():
+        if field not in normalized and field != "images" and isinstance(value, (str, list)):
+            normalized[field] = value
+    return normalized
+
+
+class TemplateCatalogue:
+    """
+    Template list cached for `ttl` seconds.
+
+    Refreshes are serialized so concurrent callers share one upstream fetch,
+    check the cross-worker cache before going upstream, and incrementally
+    update the search index. If a refresh fails, the previous catalogue keeps
+    being served.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.templates: Optional[List[Dict[str, Any]]] = None
+        self.fetched_at = 0.0
+        self.error: Optional[str] = None  # Reason the last refresh failed
+        self.version: Optional[str] = None  # Content hash of the current catalogue
+        self.index = TemplateIndex()
+        # version -> templates, most recent last
+        self._snapshots: OrderedDict[str, List[Dict[str, Any]]] = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    def reset(self) -> None:
+        """Recreate the refresh lock for a new event loop; the catalogue is kept."""
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self.templates is not None and time.monotonic() - self.fetched_at < self.ttl
+
+    async def get(self, fetch: Callable[[], Awaitable[Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the catalogue, refreshing it with `fetch` when stale.
+
+        Args:
+            fetch: Coroutine function returning the raw upstream template list.
+
+        Returns:
+            The normalized templates, or None if none could be loaded (see `error`).
+        """
+        if self._fresh():
+            return self.templates
+
+        async with self._lock:
+            if self._fresh():
+                return self.templates
+
+            cached = await cache.get(CACHE_KEY)
+            if cached is not None:
+                self.set(cached["templates"], cached["fetched_at"])
+                return self.templates
+
+            data = await fetch()
+            if data is None:
+                self.error = "Unable to fetch templates due to an API error. Check server logs."
+            elif not isinstance(data, list):
+                self.error = f"Unexpected response format received for templates: {type(data).__name__}"
+            else:
+                self.set([normalize_template(template) for template in data])
+                await cache.set(CACHE_KEY, {"templates": self.templates, "fetched_at": time.time()}, self.ttl)
+                return self.templates
+
+            if self.templates is not None:
+                logging.warning(f"Template refresh failed, serving cached catalogue: {self.error}")
+            return self.templates
+
+    def set(self, templates: List[Dict[str, Any]], fetched_at: Optional[float] = None) -> None:
+        """
+        Replace the catalogue and update the search index.
+
+        Args:
+            templates: Normalized templates.
+            fetched_at: Unix timestamp the templates were fetched upstream, if
+                they came from the shared cache; defaults to now.
+        """
+        version = hashlib.sha256(json.dumps(templates, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        age = time.time() - fetched_at if fetched_at is not None else 0.0
+        self.fetched_at = time.monotonic() - max(age, 0.0)
+        self.error = None
+        if version == self.version:
+            return
+
+        self.templates = templates
+        self.version = version
+        self._snapshots[version] = templates
+        while len(self._snapshots) > MAX_SNAPSHOTS:
+            self._snapshots.popitem(last=False)
+
+        added, changed, removed = self.index.update(templates)
+        if added or changed or removed:
+            logging.info(f"Template index updated: {added} added, {changed} changed, {removed} removed")
+
+    def snapshot(self, version: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the catalogue as it was at `version`, if still retained."""
+        return self._snapshots.get(version)
+
+
+def encode_cursor(version: str, offset: int) -> str:
+    """Opaque pagination cursor pointing at `offset` in catalogue `version`."""
+    raw = json.dumps({"v": version, "o": offset}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+    """Return (version, offset) for a cursor, or None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        version, offset = data["v"], data["o"]
+    except (ValueError, TypeError, KeyError):
+        return None
+
+    if not isinstance(version, str) or not isinstance(offset, int) or offset < 0:
+        return None
+    return version, offset
+
+
+template_catalogue = TemplateCatalogue(TEMPLATE_CACHE_TTL)
@@ -0,0 +1,148 @@
+"""
+In-memory search index over the template catalogue.
+"""
+import re
+import heapq
+from typing import Any, Dict, Iterable, List, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Relative weight of a token by the field it came from
+NAME_WEIGHT = 2.0
+METADATA_WEIGHT = 1.0
+# Share of a token's weight credited when the query only matches its prefix
+PREFIX_FACTOR = 0.5
+# Bonus for templates whose name equals / starts with the whole query
+EXACT_NAME_BONUS = 10.0
+NAME_PREFIX_BONUS = 3.0
+# Fields that hold URLs rather than searchable text
+UNINDEXED_FIELDS = {"cover", "content", "images"}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens of text."""
+    return _TOKEN.findall(text.lower())
+
+
+def _document_tokens(template: Dict[str, Any]) -> Dict[str, float]:
+    """Map each token of a template to the highest weight it appears with."""
+    tokens: Dict[str, float] = {}
+
+    def add(text: str, weight: float) -> None:
+        for token in tokenize(text):
+            tokens[token] = max(tokens.get(token, 0.0), weight)
+
+    add(str(template.get("name", "")), NAME_WEIGHT)
+    for field, value in template.items():
+        if field == "name" or field in UNINDEXED_FIELDS:
+            continue
+        if isinstance(value, str):
+            add(value, METADATA_WEIGHT)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                if isinstance(item, str):
+                    add(item, METADATA_WEIGHT)
+
+    return tokens
+
+
+class TemplateIndex:
+    """
+    Token and prefix index over template names and metadata.
+
+    `update` diffs the new catalogue against the indexed one and only
+    re-indexes templates that were added, removed or changed.
+    """
+
+    def __init__(self):
+        # template name -> {token: weight}
+        self._documents: Dict[str, Dict[str, float]] = {}
+        # token -> {template name: weight}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # prefix -> tokens starting with it
+        self._prefixes: Dict[str, set] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def update(self, templates: Iterable[Dict[str, Any]]) -> Tuple[int, int, int]:
+        """
+        Bring the index in line with a catalogue.
+
+        Returns:
+            A tuple of (added, changed, removed) template counts.
+        """
+        incoming = {str(template.get("name", "")): _document_tokens(template) for template in templates}
+        added = changed = 0
+
+        removed_names = [name for name in self._documents if name not in incoming]
+        for name in removed_names:
+            self._remove(name)
+
+        for name, tokens in incoming.items():
+            current = self._documents.get(name)
+            if current == tokens:
+                continue
+            if current is None:
+                added += 1
+            else:
+                changed += 1
+                self._remove(name)
+            self._add(name, tokens)
+
+        return added, changed, len(removed_names)
+
+    def _add(self, name: str, tokens: Dict[str, float]) -> None:
+        self._documents[name] = tokens
+        for token, weight in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                for end in range(1, len(token)):
+                    self._prefixes.setdefault(token[:end], set()).add(token)
+            postings[name] = weight
+
+    def _remove(self, name: str) -> None:
+        for token in self._documents.pop(name):
+            postings = self._postings[token]
+            del postings[name]
+            if postings:
+                continue
+            del self._postings[token]
+            for end in range(1, len(token)):
+                prefix_tokens = self._prefixes[token[:end]]
+                prefix_tokens.discard(token)
+                if not prefix_tokens:
+                    del self._prefixes[token[:end]]
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        Rank templates against a free-text query.
+
+        Each query token credits templates containing it exactly (full weight)
+        or as a prefix of a longer token (PREFIX_FACTOR of the weight); names
+        matching the whole query get an extra bonus.
+
+        Returns:
+            Up to `limit` (template name, score) pairs, best first.
+        """
+        scores: Dict[str, float] = {}
+        for query_token in set(tokenize(query)):
+            best: Dict[str, float] = dict(self._postings.get(query_token, {}))
+            for token in self._prefixes.get(query_token, ()):
+                for name, weight in self._postings[token].items():
+                    best[name] = max(best.get(name, 0.0), weight * PREFIX_FACTOR)
+            for name, score in best.items():
+                scores[name] = scores.get(name, 0.0) + score
+
+        normalized_query = query.strip().lower()
+        if normalized_query:
+            for name in scores:
+                lowered = name.lower()
+                if lowered == normalized_query:
+                    scores[name] += EXACT_NAME_BONUS
+                elif lowered.startswith(normalized_query):
+                    scores[name] += NAME_PREFIX_BONUS
+
+        top = heapq.nsmallest(max(limit, 0), scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(name, round(score, 3)) for name, score in top]
@@ -0,0 +1,210 @@
+"""
+Idle session reaping for the stateful streamable HTTP transport.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from mcp.server.streamable_http import StreamableHTTPServerTransport
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+
+from event_store import InMemoryEventStore, StreamOwner
+
+logger = logging.getLogger(__name__)
+
+# Reaped session IDs remembered so that requests using them get a 404
+MAX_TERMINATED_SESSIONS = 10000
+
+
+def check_sdk_compatibility(session_manager: StreamableHTTPSessionManager) -> None:
+    """
+    Verify that the installed MCP SDK has the private members the reaper uses.
+
+    Raises:
+        RuntimeError: If any of them is missing, so that an incompatible SDK
+            fails at startup rather than on the first reaping pass.
+    """
+    missing = []
+    if not isinstance(getattr(session_manager, "_server_instances", None), dict):
+        missing.append("StreamableHTTPSessionManager._server_instances")
+    if not callable(getattr(StreamableHTTPServerTransport, "_terminate_session", None)):
+        missing.append("StreamableHTTPServerTransport._terminate_session")
+    if not isinstance(getattr(StreamableHTTPServerTransport(mcp_session_id=None), "_request_streams", None), dict):
+        missing.append("StreamableHTTPServerTransport._request_streams")
+    if missing:
+        raise RuntimeError(
+            f"Session reaping is incompatible with the installed mcp package (missing {', '.join(missing)})"
+        )
+
+
+class SessionReaper:
+    """
+    Terminates MCP sessions that have been idle too long, and the least
+    recently used sessions beyond a maximum count, so that clients which
+    initialize and walk away do not keep transports and event streams alive.
+
+    Sessions with a request in flight are never reaped. The session manager
+    has no public API for this, so terminated transports are removed from its
+    `_server_instances` map directly; their IDs are remembered so that later
+    requests get a 404 and the client re-initializes. A reaped session's event
+    streams are dropped along with it. The private SDK members are checked on
+    construction (see check_sdk_compatibility).
+    """
+
+    def __init__(
+        self,
+        session_manager: StreamableHTTPSessionManager,
+        event_store: InMemoryEventStore,
+        idle_timeout: float = 1800.0,
+        max_sessions: int = 1000,
+        interval: float = 60.0,
+    ):
+        """Initialize the reaper.
+
+        Args:
+            session_manager: Manager whose sessions are reaped
+            event_store: Event store whose idle streams are pruned alongside
+            idle_timeout: Seconds without requests after which a session is reaped
+            max_sessions: Maximum number of live sessions
+            interval: Seconds between reaping passes
+
+        Raises:
+            RuntimeError: If the installed MCP SDK lacks the members used for reaping.
+        """
+        check_sdk_compatibility(session_manager)
+        self.session_manager = session_manager
+        self.event_store = event_store
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.interval = interval
+        # session_id -> monotonic time of last activity, least recent first
+        self.last_activity: OrderedDict[str, float] = OrderedDict()
+        # session_id -> number of requests currently being handled
+        self.in_flight: dict[str, int] = {}
+        # session_id -> owner of the session's event streams
+        self.owners: dict[str, StreamOwner] = {}
+        # Recently reaped session IDs, oldest first
+        self.terminated: OrderedDict[str, None] = OrderedDict()
+        self.reaped = 0
+        self._wake = asyncio.Event()
+
+    def touch(self, session_id: str, owner: StreamOwner | None = None) -> None:
+        """Record activity on a session, and the owner of its event streams if given."""
+        if owner is not None:
+            self.owners[session_id] = owner
+        is_new = session_id not in self.last_activity
+        self.last_activity[session_id] = time.monotonic()
+        self.last_activity.move_to_end(session_id)
+        if is_new and len(self.last_activity) > self.max_sessions:
+            self._wake.set()
+
+    def begin(self, session_id: str) -> None:
+        """Mark the start of a request on a session."""
+        self.touch(session_id)
+        self.in_flight[session_id] = self.in_flight.get(session_id, 0) + 1
+
+    def was_terminated(self, session_id: str) -> bool:
+        """Whether the session was reaped (recently enough to be remembered)."""
+        return session_id in self.terminated
+
+    def _forget(self, session_id: str) -> int:
+        """Stop tracking a session and drop its event streams.
+
+        Returns:
+            The number of event streams removed.
+        """
+        self.last_activity.pop(session_id, None)
+        owner = self.owners.pop(session_id, None)
+        return self.event_store.remove_owner(owner) if owner is not None else 0
+
+    def end(self, session_id: str) -> None:
+        """Mark the end of a request on a session."""
+        remaining = self.in_flight.get(session_id, 1) - 1
+        if remaining > 0:
+            self.in_flight[session_id] = remaining
+        else:
+            self.in_flight.pop(session_id, None)
+        if session_id in self.last_activity:
+            self.touch(session_id)
+
+    async def run(self) -> None:
+        """Reap periodically, or immediately when the session cap is exceeded."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.error(f"Session reaping failed: {e}", exc_info=True)
+
+    async def reap(self) -> int:
+        """Terminate idle and excess sessions.
+
+        Returns:
+            The number of sessions terminated.
+        """
+        instances = self.session_manager._server_instances
+
+        # Forget sessions the manager no longer knows about, and start
+        # tracking any it created without us seeing the session ID
+        removed_streams = 0
+        for session_id in list(self.last_activity):
+            if session_id not in instances:
+                removed_streams += self._forget(session_id)
+        for session_id in instances:
+            if session_id not in self.last_activity:
+                self.touch(session_id)
+
+        cutoff = time.monotonic() - self.idle_timeout
+        excess = len(self.last_activity) - self.max_sessions
+        victims = []
+        for session_id, last_seen in self.last_activity.items():
+            if session_id in self.in_flight:
+                continue
+            if last_seen <= cutoff or len(victims) < excess:
+                victims.append(session_id)
+
+        for session_id in victims:
+            removed_streams += self._forget(session_id)
+            self.terminated[session_id] = None
+            transport = instances.pop(session_id, None)
+            if transport is not None:
+                await transport._terminate_session()
+        while len(self.terminated) > MAX_TERMINATED_SESSIONS:
+            self.terminated.popitem(last=False)
+
+        self.reaped += len(victims)
+        removed_streams += self.event_store.prune_idle(self.idle_timeout)
+        if victims or removed_streams:
+            logger.info(f"Reaped {len(victims)} idle sessions and {removed_streams} event streams")
+        return len(victims)
+
+    def stats(self) -> dict:
+        """Live session gauge with per-session idle time and open streams."""
+        now = time.monotonic()
+        instances = self.session_manager._server_instances
+        sessions = {}
+        for session_id, last_seen in self.last_activity.items():
+            transport = instances.get(session_id)
+            owner = self.owners.get(session_id)
+            # Session IDs authorize requests, so only expose a prefix
+            sessions[session_id[:8]] = {
+                "idle_seconds": round(now - last_seen, 1),
+                "in_flight": self.in_flight.get(session_id, 0),
+                "open_streams": len(transport._request_streams) if transport is not None else 0,
+                "event_streams": len(owner.streams) if owner is not None else 0,
+                "event_bytes": owner.bytes if owner is not None else 0,
+            }
+
+        return {
+            "live_sessions": len(instances),
+            "max_sessions": self.max_sessions,
+            "idle_timeout_seconds": self.idle_timeout,
+            "reaped_total": self.reaped,
+            "event_store": self.event_store.stats(),
+            "sessions": sessions,
+        }
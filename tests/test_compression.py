@@ -0,0 +1,128 @@
+import os
+import sys
+import unittest
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from helper.compression import CompressionMiddleware, accepted_encodings, brotli  # noqa: E402
+
+EVENTS = [
+    b'event: message\r\ndata: {"jsonrpc":"2.0","method":"notifications/progress","params":{"progress":1}}\r\n\r\n',
+    b'event: message\r\ndata: {"jsonrpc":"2.0","method":"notifications/progress","params":{"progress":2}}\r\n\r\n',
+    b'event: message\r\ndata: {"jsonrpc":"2.0","id":1,"result":{"content":[]}}\r\n\r\n',
+]
+
+
+def event_stream_app(events):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream")],
+        })
+        for event in events:
+            await send({"type": "http.response.body", "body": event, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    return app
+
+
+def json_app(body):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+    return app
+
+
+async def call(app, accept_encoding):
+    """Run app through CompressionMiddleware; return (response headers, body chunks)."""
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await CompressionMiddleware(app, minimum_size=64)(scope, receive, send)
+    headers = {key.decode(): value.decode() for key, value in messages[0]["headers"]}
+    return headers, [message["body"] for message in messages[1:]]
+
+
+class CompressionEventStreamTest(unittest.IsolatedAsyncioTestCase):
+    async def test_gzip_chunks_decode_to_complete_events(self):
+        headers, chunks = await call(event_stream_app(EVENTS), "gzip")
+
+        self.assertEqual(headers["content-encoding"], "gzip")
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # Each chunk decodes on its own into exactly one event, so no event
+        # is held back in the encoder
+        for event, chunk in zip(EVENTS, chunks):
+            self.assertEqual(decompressor.decompress(chunk), event)
+        self.assertEqual(decompressor.decompress(chunks[-1]) + decompressor.flush(), b"")
+        self.assertTrue(decompressor.eof)
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    async def test_brotli_chunks_decode_to_complete_events(self):
+        headers, chunks = await call(event_stream_app(EVENTS), "br")
+
+        self.assertEqual(headers["content-encoding"], "br")
+        decompressor = brotli.Decompressor()
+        for event, chunk in zip(EVENTS, chunks):
+            self.assertEqual(decompressor.process(chunk), event)
+        self.assertEqual(decompressor.process(chunks[-1]), b"")
+        self.assertTrue(decompressor.is_finished())
+
+
+class CompressionResponseTest(unittest.IsolatedAsyncioTestCase):
+    async def test_small_response_is_sent_as_identity(self):
+        body = b'{"ok":true}'
+        headers, chunks = await call(json_app(body), "gzip, br")
+
+        self.assertNotIn("content-encoding", headers)
+        self.assertEqual(headers["content-length"], str(len(body)))
+        self.assertEqual(chunks, [body])
+
+    async def test_large_response_is_compressed(self):
+        body = b'{"templates":[' + b",".join(b'{"name":"default"}' for _ in range(50)) + b"]}"
+        headers, chunks = await call(json_app(body), "gzip")
+
+        self.assertEqual(headers["content-encoding"], "gzip")
+        self.assertNotIn("content-length", headers)
+        self.assertEqual(zlib.decompress(b"".join(chunks), 16 + zlib.MAX_WBITS), body)
+
+
+class CompressionNegotiationTest(unittest.IsolatedAsyncioTestCase):
+    def test_accepted_encodings_parses_q_values(self):
+        self.assertEqual(
+            accepted_encodings("gzip;q=0.5, BR, identity;q=bogus"),
+            {"gzip": 0.5, "br": 1.0, "identity": 0.0},
+        )
+
+    async def test_zero_q_value_refuses_an_encoding(self):
+        headers, _ = await call(event_stream_app(EVENTS), "br;q=0, gzip;q=0.8")
+        self.assertEqual(headers["content-encoding"], "gzip")
+
+        headers, chunks = await call(event_stream_app(EVENTS), "gzip;q=0")
+        self.assertNotIn("content-encoding", headers)
+        self.assertEqual(b"".join(chunks), b"".join(EVENTS))
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    async def test_highest_q_value_wins_and_brotli_breaks_ties(self):
+        headers, _ = await call(event_stream_app(EVENTS), "gzip;q=1, br;q=0.5")
+        self.assertEqual(headers["content-encoding"], "gzip")
+
+        headers, _ = await call(event_stream_app(EVENTS), "gzip, br")
+        self.assertEqual(headers["content-encoding"], "br")
+
+        headers, _ = await call(event_stream_app(EVENTS), "gzip;q=0.5, *")
+        self.assertEqual(headers["content-encoding"], "br")
+
+
+if __name__ == "__main__":
+    unittest.main()
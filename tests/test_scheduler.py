@@ -0,0 +1,93 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from services.scheduler import GenerationScheduler  # noqa: E402
+
+
+class GenerationSchedulerCancellationTest(unittest.IsolatedAsyncioTestCase):
+    async def test_waiter_cancelled_while_slot_is_released(self):
+        scheduler = GenerationScheduler(1, 1)
+        release = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot("session-a"):
+                await release.wait()
+
+        async def waiter():
+            async with scheduler.slot("session-b"):
+                pass
+
+        holder_task = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiter_task = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+
+        # Release the slot and cancel the queued waiter in the same iteration
+        release.set()
+        waiter_task.cancel()
+        holder_result, waiter_result = await asyncio.gather(holder_task, waiter_task, return_exceptions=True)
+
+        self.assertIsNone(holder_result)
+        self.assertIsInstance(waiter_result, asyncio.CancelledError)
+        self.assertEqual(scheduler.in_flight, 0)
+        stats = scheduler.stats()
+        self.assertEqual(stats["queued"], 0)
+        # Only the holder was served; the cancelled waiter left nothing behind
+        self.assertEqual(list(stats["sessions"]), ["session-"])
+        self.assertEqual(stats["sessions"]["session-"]["served"], 1)
+        self.assertEqual(stats["sessions"]["session-"]["in_flight"], 0)
+
+        # The slot is usable again
+        async with scheduler.slot("session-c"):
+            self.assertEqual(scheduler.in_flight, 1)
+        self.assertEqual(scheduler.in_flight, 0)
+
+    async def test_cancelled_waiter_does_not_block_later_waiters(self):
+        scheduler = GenerationScheduler(1, 1)
+        release = asyncio.Event()
+        served = []
+
+        async def holder():
+            async with scheduler.slot("session-a"):
+                await release.wait()
+
+        async def waiter(session_id):
+            async with scheduler.slot(session_id):
+                served.append(session_id)
+
+        holder_task = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        cancelled_task = asyncio.create_task(waiter("session-b"))
+        later_task = asyncio.create_task(waiter("session-c"))
+        await asyncio.sleep(0)
+
+        cancelled_task.cancel()
+        release.set()
+        await asyncio.wait_for(asyncio.gather(holder_task, later_task), timeout=1)
+
+        self.assertEqual(served, ["session-c"])
+        self.assertEqual(scheduler.in_flight, 0)
+
+
+class GenerationSchedulerStatsTest(unittest.IsolatedAsyncioTestCase):
+    async def test_wait_times_outlive_idle_sessions(self):
+        scheduler = GenerationScheduler(1, 1, max_stats_sessions=2)
+
+        for session_id in ["aaaaaaaa-1", "bbbbbbbb-1", "aaaaaaaa-1", "cccccccc-1"]:
+            async with scheduler.slot(session_id):
+                pass
+
+        sessions = scheduler.stats()["sessions"]
+        # Least recently served session is evicted beyond the cap
+        self.assertEqual(list(sessions), ["aaaaaaaa", "cccccccc"])
+        self.assertEqual(sessions["aaaaaaaa"]["served"], 2)
+        self.assertEqual(sessions["aaaaaaaa"]["queued"], 0)
+        self.assertEqual(sessions["aaaaaaaa"]["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
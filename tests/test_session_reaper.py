@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+
+import httpx
+from mcp.server.lowlevel import Server
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from mcp.types import JSONRPCMessage, JSONRPCNotification
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from event_store import InMemoryEventStore, StreamOwner, stream_owner  # noqa: E402
+from session_reaper import SessionReaper, check_sdk_compatibility  # noqa: E402
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {"protocolVersion": "2025-06-18", "capabilities": {}, "clientInfo": {"name": "test", "version": "0"}},
+}
+HEADERS = {"accept": "application/json, text/event-stream"}
+
+
+class SessionReaperTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.event_store = InMemoryEventStore()
+        self.session_manager = StreamableHTTPSessionManager(app=Server("test"), event_store=self.event_store)
+        self.reaper = SessionReaper(self.session_manager, self.event_store, idle_timeout=0)
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.session_manager.handle_request), base_url="http://test"
+        )
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_reaps_idle_session_against_installed_sdk(self):
+        async with self.session_manager.run():
+            response = await self.client.post("/mcp", json=INITIALIZE, headers=HEADERS)
+            self.assertEqual(response.status_code, 200)
+            session_id = response.headers["mcp-session-id"]
+            transport = self.session_manager._server_instances[session_id]
+
+            owner = StreamOwner(session_id)
+            token = stream_owner.set(owner)
+            try:
+                await self.event_store.store_event(
+                    "stream-1", JSONRPCMessage(JSONRPCNotification(jsonrpc="2.0", method="notifications/test"))
+                )
+            finally:
+                stream_owner.reset(token)
+            self.reaper.touch(session_id, owner)
+            self.assertEqual(self.reaper.stats()["sessions"][session_id[:8]]["event_streams"], 1)
+
+            self.assertEqual(await self.reaper.reap(), 1)
+
+            self.assertNotIn(session_id, self.session_manager._server_instances)
+            self.assertTrue(transport._terminated)
+            self.assertTrue(self.reaper.was_terminated(session_id))
+            self.assertEqual(self.event_store.remove_owner(owner), 0)
+            self.assertEqual(self.reaper.stats()["live_sessions"], 0)
+
+    async def test_session_with_request_in_flight_is_kept(self):
+        async with self.session_manager.run():
+            response = await self.client.post("/mcp", json=INITIALIZE, headers=HEADERS)
+            session_id = response.headers["mcp-session-id"]
+
+            self.reaper.begin(session_id)
+            self.assertEqual(await self.reaper.reap(), 0)
+            self.assertIn(session_id, self.session_manager._server_instances)
+
+            self.reaper.end(session_id)
+            self.assertEqual(await self.reaper.reap(), 1)
+
+    def test_incompatible_sdk_fails_loudly(self):
+        with self.assertRaises(RuntimeError):
+            check_sdk_compatibility(object())
+
+
+if __name__ == "__main__":
+    unittest.main()